@@ -4,3 +4,5 @@ set -o errexit
 pip install -r requirements.txt
 python manage.py collectstatic --noinput
 python manage.py migrate
+# seed hot scores of posts that predate them; the ranker process keeps them decaying
+python manage.py recompute_hot_scores --all
@@ -1,4 +1,12 @@
-from .models import Profile
+from django.utils.functional import SimpleLazyObject
+
+from .leaderboard import top_creators as cached_top_creators
+from .viewer import get_viewer
+
+# Values below are lazy: the query (or cache read) runs only if a template
+# actually reads them, so JSON endpoints and pages without the navbar badge or
+# sidebar pay nothing. Memoization in request.viewer keeps it to once per
+# request even across several render() / render_to_string() calls.
 
 
 def current_profile(request):
@@ -6,52 +14,45 @@ def current_profile(request):
     Returns {'profile': Profile instance or None}.
     """
     if request.user.is_authenticated:
-        try:
-            profile, _ = Profile.objects.get_or_create(user=request.user)
-            return {'profile': profile}
-        except Exception:
-            return {'profile': None}
+        viewer = get_viewer(request)
+
+        def load():
+            try:
+                return viewer.profile
+            except Exception:
+                return None
+
+        return {'profile': SimpleLazyObject(load)}
     return {'profile': None}
-from .models import Notification
+
 
 def notifications(request):
     if request.user.is_authenticated:
+        viewer = get_viewer(request)
         return {
-            'notifications': Notification.objects.filter(
-                recipient=request.user
-            ).order_by('-created_at')[:10],
-            'unread_notifications_count': Notification.objects.filter(
-                recipient=request.user,
-                is_read=False
-            ).count()
+            'notifications': SimpleLazyObject(lambda: viewer.recent_notifications),
+            'unread_notifications_count': SimpleLazyObject(lambda: viewer.unread_notifications_count),
         }
     return {}
+
+
 def notification_count(request):
     if request.user.is_authenticated:
+        viewer = get_viewer(request)
         return {
-            "unread_notifications_count": Notification.objects.filter(
-                recipient=request.user,
-                is_read=False
-            ).count()
+            "unread_notifications_count": SimpleLazyObject(lambda: viewer.unread_notifications_count)
         }
     return {}
 
 
 def top_creators(request):
-    # select_related to avoid N+1 when accessing .user, limit to top 5
-    data = {
-        'top_creators': Profile.objects.select_related('user')
-            .only('user__username', 'photo', 'reputation_score', 'level')
-            .order_by('-reputation_score')[:5]
-    }
+    # served from the cached leaderboard (core.leaderboard)
+    data = {'top_creators': SimpleLazyObject(cached_top_creators)}
 
     # Provide a quick lookup of which users the current user follows so templates
     # can render Follow/Unfollow without extra queries per-row.
     if request.user.is_authenticated:
-        from .models import Follow
-        try:
-            data['following_ids'] = list(Follow.objects.filter(follower=request.user).values_list('following_id', flat=True))
-        except Exception:
-            data['following_ids'] = []
+        viewer = get_viewer(request)
+        data['following_ids'] = SimpleLazyObject(lambda: viewer.following_ids)
 
     return data
@@ -0,0 +1,147 @@
+"""Hashtag extraction, the write-time hashtag index and trending counters.
+
+Published posts get one ``PostHashtag`` row per distinct tag, so hashtag
+search is an exact, indexed lookup instead of ``content__icontains``. Every
+indexed tag also bumps an hourly ``HashtagBucket``; "trending" is the sum of
+the last few buckets.
+"""
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Hashtag, HashtagBucket, PostHashtag
+
+HASHTAG_RE = re.compile(r"#(\w+)")
+MAX_TAG_LENGTH = 100
+
+# trending looks at this many hourly buckets
+TRENDING_WINDOW_HOURS = 24
+TRENDING_LIMIT = 8
+# buckets older than this are deleted by prune_hashtag_buckets
+BUCKET_RETENTION_HOURS = 48
+
+
+def extract_hashtags(text):
+    """Distinct lowercase tags in ``text`` (without '#'), in order of appearance."""
+    tags = []
+    for tag in HASHTAG_RE.findall(text or ''):
+        tag = tag.lower()[:MAX_TAG_LENGTH]
+        if tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def hashtag_ids(names):
+    """Map tag names to Hashtag ids, creating missing rows."""
+    if not names:
+        return {}
+    Hashtag.objects.bulk_create([Hashtag(name=n) for n in names], ignore_conflicts=True)
+    return dict(Hashtag.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def bucket_start(when):
+    """Floor ``when`` to the start of its hourly bucket."""
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+def bump_buckets(counts, delta=1):
+    """Add ``delta`` × n to the buckets in ``counts`` ({(hashtag_id, bucket_start): n}).
+
+    Buckets already past retention are left alone.
+    """
+    oldest = bucket_start(timezone.now()) - timedelta(hours=BUCKET_RETENTION_HOURS)
+    counts = {key: n for key, n in counts.items() if key[1] >= oldest}
+    if not counts:
+        return
+
+    if delta > 0:
+        HashtagBucket.objects.bulk_create(
+            [HashtagBucket(hashtag_id=tag_id, bucket_start=start) for tag_id, start in counts],
+            ignore_conflicts=True
+        )
+
+    by_amount = {}
+    for (tag_id, start), n in counts.items():
+        by_amount.setdefault((start, n), []).append(tag_id)
+    for (start, n), tag_ids in by_amount.items():
+        HashtagBucket.objects.filter(hashtag_id__in=tag_ids, bucket_start=start).update(
+            count=Greatest(F('count') + delta * n, 0)
+        )
+
+
+def sync_post_hashtags(post):
+    """Bring the index rows of ``post`` in line with its content and status.
+
+    Drafts have no index rows; deleting a post cascades its rows away. Rows
+    removed here (or by a cascade) give their bucket count back through the
+    PostHashtag post_delete receiver. Returns the names of tags added or
+    removed.
+    """
+    tags = set(extract_hashtags(post.content)) if post.status == 'published' else set()
+
+    existing = dict(
+        PostHashtag.objects.filter(post=post).values_list('hashtag__name', 'id')
+    )
+    stale = {name: row_id for name, row_id in existing.items() if name not in tags}
+    if stale:
+        PostHashtag.objects.filter(id__in=stale.values()).delete()
+
+    missing = tags - set(existing)
+    if missing:
+        ids = hashtag_ids(missing)
+        now = timezone.now()
+        PostHashtag.objects.bulk_create(
+            [PostHashtag(post=post, hashtag_id=ids[name], created_at=now) for name in missing],
+            ignore_conflicts=True
+        )
+        bump_buckets({(ids[name], bucket_start(now)): 1 for name in missing})
+
+    return missing | set(stale)
+
+
+def index_posts(posts):
+    """Bulk-add index rows for many published posts (used by the backfill).
+
+    Posts that are already indexed are skipped. Rows are dated at the post's
+    creation so old posts only count towards trending if they are recent.
+    """
+    posts = list(posts)
+    done = set(
+        PostHashtag.objects.filter(post_id__in=[p.id for p in posts])
+        .values_list('post_id', flat=True)
+    )
+    posts = [p for p in posts if p.id not in done]
+
+    tags_by_post = {post: extract_hashtags(post.content) for post in posts}
+    ids = hashtag_ids({name for tags in tags_by_post.values() for name in tags})
+    rows = [
+        PostHashtag(post_id=post.id, hashtag_id=ids[name], created_at=post.created_at)
+        for post, tags in tags_by_post.items()
+        for name in tags
+    ]
+    PostHashtag.objects.bulk_create(rows, ignore_conflicts=True)
+    bump_buckets(Counter((row.hashtag_id, bucket_start(row.created_at)) for row in rows))
+    return len(rows)
+
+
+def trending_hashtags(limit=TRENDING_LIMIT, hours=TRENDING_WINDOW_HOURS):
+    """Names of the most used tags over the last ``hours`` hourly buckets."""
+    since = bucket_start(timezone.now()) - timedelta(hours=hours - 1)
+    rows = (
+        HashtagBucket.objects.filter(bucket_start__gte=since)
+        .values('hashtag__name')
+        .annotate(total=Sum('count'))
+        .filter(total__gt=0)
+        .order_by('-total', 'hashtag__name')[:limit]
+    )
+    return [row['hashtag__name'] for row in rows]
+
+
+def prune_buckets(hours=BUCKET_RETENTION_HOURS):
+    """Delete buckets older than the retention window; returns rows deleted."""
+    cutoff = bucket_start(timezone.now()) - timedelta(hours=hours)
+    return HashtagBucket.objects.filter(bucket_start__lt=cutoff).delete()[0]
@@ -0,0 +1,88 @@
+"""Cached creator leaderboard.
+
+The top LEADERBOARD_SIZE profiles by reputation are cached as one entry,
+together with the score of the last one (the cutoff). A recalculation only
+drops the cache when it could change the board: the user was on it, or now
+scores above the cutoff. Ranks beyond the board are a COUNT over the
+``profile_reputation`` index.
+"""
+from django.core.cache import cache
+
+from .models import Profile
+
+LEADERBOARD_SIZE = 100
+LEADERBOARD_PAGE_SIZE = 25
+TOP_CREATORS_LIMIT = 5
+
+LEADERBOARD_CACHE_KEY = 'leaderboard:top'
+# safety net; normally the entry is dropped by note_reputation_change
+LEADERBOARD_TTL = 3600
+
+
+def _ranked():
+    return Profile.objects.select_related('user').order_by('-reputation_score', 'id')
+
+
+def _load():
+    entry = cache.get(LEADERBOARD_CACHE_KEY)
+    if entry is None:
+        profiles = list(
+            _ranked().only('id', 'user__username', 'photo', 'reputation_score', 'score', 'level')
+            [:LEADERBOARD_SIZE]
+        )
+        full = len(profiles) >= LEADERBOARD_SIZE
+        entry = {
+            'profiles': profiles,
+            # with a partial board any change can enter it
+            'cutoff': profiles[-1].reputation_score if full else None,
+            'user_ids': {p.user_id for p in profiles},
+        }
+        cache.set(LEADERBOARD_CACHE_KEY, entry, LEADERBOARD_TTL)
+    return entry
+
+
+def leaderboard():
+    """The cached top LEADERBOARD_SIZE profiles, best first (``user`` loaded)."""
+    return _load()['profiles']
+
+
+def top_creators(limit=TOP_CREATORS_LIMIT):
+    return leaderboard()[:limit]
+
+
+def leaderboard_page(page, page_size=LEADERBOARD_PAGE_SIZE):
+    """Return ``(profiles, has_next)`` for a 1-based page of the full ranking."""
+    offset = (page - 1) * page_size
+    if offset + page_size < LEADERBOARD_SIZE:
+        # the whole page plus its look-ahead row is on the cached board
+        rows = leaderboard()[offset:offset + page_size + 1]
+    else:
+        rows = list(_ranked()[offset:offset + page_size + 1])
+    return rows[:page_size], len(rows) > page_size
+
+
+def rank_of(profile):
+    """1-based position of ``profile`` in the ranking."""
+    for i, p in enumerate(leaderboard(), start=1):
+        if p.id == profile.id:
+            return i
+    ahead = Profile.objects.filter(reputation_score__gt=profile.reputation_score).count()
+    # equal scores are ordered by id, as in the board
+    ties = Profile.objects.filter(reputation_score=profile.reputation_score, id__lt=profile.id).count()
+    return ahead + ties + 1
+
+
+def invalidate_leaderboard():
+    cache.delete(LEADERBOARD_CACHE_KEY)
+
+
+def note_reputation_change(user_id, old_score, new_score):
+    """Drop the cached board if this change can alter it."""
+    if old_score == new_score:
+        return
+    entry = cache.get(LEADERBOARD_CACHE_KEY)
+    if entry is None:
+        return
+    cutoff = entry['cutoff']
+    if user_id in entry['user_ids'] or cutoff is None or new_score >= cutoff:
+        invalidate_leaderboard()
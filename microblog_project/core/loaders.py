@@ -0,0 +1,107 @@
+"""Batch loaders for pages of posts.
+
+Each loader takes an already-fetched page of posts and attaches the related
+data templates need as plain attributes, using a fixed number of queries no
+matter how many posts (or comments) are on the page.
+"""
+from django.db.models import Count
+
+from .models import Bookmark, Comment, CommentLike, CommunityComment, Like
+
+
+def attach_comment_trees(posts):
+    """Preload the comment tree of every post on the page in one query.
+
+    Sets ``post.comment_tree`` to its top-level comments (oldest first). Each
+    comment gets ``reply_list`` (its direct replies) and ``like_total``, with
+    ``user`` already joined. Community posts are skipped; the feed fills
+    theirs from the prefetched community comments.
+    """
+    posts = [p for p in posts if not getattr(p, 'is_community', False)]
+    if not posts:
+        return
+
+    comments = list(
+        Comment.objects.filter(post_id__in=[p.id for p in posts])
+        .select_related('user')
+        .annotate(like_total=Count('likes'))
+        .order_by('created_at', 'id')
+    )
+
+    by_id = {}
+    for comment in comments:
+        comment.reply_list = []
+        by_id[comment.id] = comment
+
+    roots = {p.id: [] for p in posts}
+    for comment in comments:
+        parent = by_id.get(comment.parent_id)
+        if parent is not None:
+            parent.reply_list.append(comment)
+        elif comment.parent_id is None:
+            roots[comment.post_id].append(comment)
+
+    for post in posts:
+        post.comment_tree = roots[post.id]
+
+
+def attach_community_comments(posts):
+    """``attach_comment_trees`` for the community posts on the page, in one query.
+
+    Community comments are flat and cannot be liked, so each gets an empty
+    ``reply_list`` and a ``like_total`` of 0.
+    """
+    posts = [p for p in posts if getattr(p, 'is_community', False)]
+    if not posts:
+        return
+
+    roots = {p.id: [] for p in posts}
+    comments = (
+        CommunityComment.objects.filter(post_id__in=list(roots))
+        .select_related('user')
+        .order_by('created_at', 'id')
+    )
+    for comment in comments:
+        comment.reply_list = []
+        comment.like_total = 0
+        roots[comment.post_id].append(comment)
+
+    for post in posts:
+        post.comment_tree = roots[post.id]
+
+
+def _page_comments(posts):
+    for post in posts:
+        for comment in getattr(post, 'comment_tree', ()):
+            yield comment
+            yield from getattr(comment, 'reply_list', ())
+
+
+def viewer_state(user, posts):
+    """Which of the posts/comments on this page the viewer liked or bookmarked.
+
+    Only the ids rendered on the page are queried, so the cost does not grow
+    with the viewer's history. Returns a dict of sets (``liked_posts``,
+    ``bookmarked_posts``, ``liked_comments``) ready to merge into a template
+    context. Comments are taken from ``attach_comment_trees`` when present.
+    """
+    state = {'liked_posts': set(), 'bookmarked_posts': set(), 'liked_comments': set()}
+    if not user.is_authenticated:
+        return state
+
+    posts = [p for p in posts if not getattr(p, 'is_community', False)]
+    post_ids = [p.id for p in posts]
+    comment_ids = [c.id for c in _page_comments(posts)]
+
+    if post_ids:
+        state['liked_posts'] = set(
+            Like.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+        )
+        state['bookmarked_posts'] = set(
+            Bookmark.objects.filter(user=user, post_id__in=post_ids).values_list('post_id', flat=True)
+        )
+    if comment_ids:
+        state['liked_comments'] = set(
+            CommentLike.objects.filter(user=user, comment_id__in=comment_ids).values_list('comment_id', flat=True)
+        )
+    return state
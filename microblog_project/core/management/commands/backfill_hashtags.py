@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from core.hashtags import index_posts
+from core.models import Post
+
+
+class Command(BaseCommand):
+    help = "Index hashtags of existing published posts, streaming them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Posts read and indexed per batch.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        posts = Post.objects.filter(status='published').only('id', 'content', 'created_at').order_by('id')
+
+        chunk = []
+        seen = rows = 0
+        for post in posts.iterator(chunk_size=chunk_size):
+            chunk.append(post)
+            if len(chunk) >= chunk_size:
+                rows += index_posts(chunk)
+                seen += len(chunk)
+                chunk = []
+                self.stdout.write(f"{seen} posts indexed...")
+        if chunk:
+            rows += index_posts(chunk)
+            seen += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {rows} hashtags across {seen} posts."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.hashtags import BUCKET_RETENTION_HOURS, prune_buckets
+
+
+class Command(BaseCommand):
+    help = "Delete hourly trending-hashtag buckets that fell out of the retention window."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=BUCKET_RETENTION_HOURS,
+                            help='Keep buckets from the last N hours.')
+
+    def handle(self, *args, **options):
+        deleted = prune_buckets(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} expired hashtag buckets."))
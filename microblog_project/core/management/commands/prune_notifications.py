@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Notification
+from core.notifications import NOTIFICATION_RETENTION_DAYS, prune_read_range
+
+
+class Command(BaseCommand):
+    help = "Delete (or archive) read notifications older than the retention window, in primary-key chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=NOTIFICATION_RETENTION_DAYS,
+                            help='Keep read notifications from the last N days.')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Expired notifications removed per transaction.')
+        parser.add_argument('--sleep', type=float, default=0.5,
+                            help='Seconds to pause between chunks.')
+        parser.add_argument('--archive', action='store_true',
+                            help='Copy rows to NotificationArchive before deleting them.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count expired notifications without deleting.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        expired = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f"Dry run: {expired.count()} read notifications older than {options['days']} days."
+            ))
+            return
+
+        chunk_size = options['chunk_size']
+        verb = 'archived' if options['archive'] else 'deleted'
+        removed = 0
+        cursor = 0
+        while True:
+            # the next chunk starts at the next expired id, so gaps cost nothing
+            ids = list(
+                expired.filter(id__gte=cursor).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            removed += prune_read_range(ids[0], ids[-1] + 1, cutoff, archive=options['archive'])
+            cursor = ids[-1] + 1
+            self.stdout.write(f"{verb} {removed} notifications (up to id {ids[-1]})")
+            if len(ids) < chunk_size:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {verb} {removed} expired notifications."))
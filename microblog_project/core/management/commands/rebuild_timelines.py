@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Post
+from core.timeline import fan_out_post
+
+
+class Command(BaseCommand):
+    help = "Fan every published post out into its author's and followers' home timelines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Posts streamed from the database per round trip.')
+
+    def handle(self, *args, **options):
+        posts = (
+            Post.objects.filter(status='published')
+            .only('id', 'user_id', 'status', 'created_at')
+            .order_by('id')
+        )
+
+        done = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            fan_out_post(post)
+            done += 1
+            if done % options['chunk_size'] == 0:
+                self.stdout.write(f"{done} posts fanned out...")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt timelines from {done} posts."))
@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Post
+from core.ranking import HOT_WINDOW_DAYS, hot_score
+
+
+class Command(BaseCommand):
+    help = "Re-apply time decay to post hot scores (run periodically, e.g. with --every 600)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Posts rescored per bulk update.')
+        parser.add_argument('--all', action='store_true',
+                            help='Rescore every post, not just recent or still-scored ones.')
+        parser.add_argument('--every', type=float,
+                            help='Keep running, rescoring every this many seconds (for a worker process).')
+
+    def handle(self, *args, **options):
+        while True:
+            updated = self.rescore(options['chunk_size'], options['all'])
+            self.stdout.write(self.style.SUCCESS(f"Rescored {updated} posts."))
+            if not options['every']:
+                break
+            time.sleep(options['every'])
+
+    def rescore(self, chunk_size, all_posts):
+        now = timezone.now()
+
+        posts = Post.objects.all()
+        if not all_posts:
+            posts = posts.filter(Q(created_at__gte=now - timedelta(days=HOT_WINDOW_DAYS)) | Q(hot_score__gt=0))
+
+        last_id = 0
+        updated = 0
+        while True:
+            chunk = list(
+                posts.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'like_count', 'comment_count', 'created_at', 'hot_score')[:chunk_size]
+            )
+            if not chunk:
+                break
+            for post in chunk:
+                score = hot_score(post.like_count, post.comment_count, post.created_at, now)
+                # posts past the window are decayed once more and then drop out
+                if post.created_at < now - timedelta(days=HOT_WINDOW_DAYS):
+                    score = 0.0
+                post.hot_score = score
+            Post.objects.bulk_update(chunk, ['hot_score'])
+            updated += len(chunk)
+            last_id = chunk[-1].id
+        return updated
@@ -0,0 +1,145 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.leaderboard import invalidate_leaderboard
+from core.models import Comment, Follow, Like, Profile
+from core.utils import ENGAGEMENT_MAX_EXPECTED, ENGAGEMENT_WEIGHTS
+
+WRITE_FIELDS = ['engagement_score', 'reputation_score', 'score', 'level', 'badge', 'last_recalc']
+
+
+def _grouped_counts(model, user_path):
+    """{user_id: rows} for one source table, in a single GROUP BY."""
+    return dict(
+        model.objects.values(user_path)
+        .annotate(n=Count('id'))
+        .order_by()
+        .values_list(user_path, 'n')
+    )
+
+
+def compute_reputations(followers, likes, comments, ai_scores, action_points):
+    """Vectorized Profile.recalc_hybrid_reputation over aligned arrays.
+
+    Returns (engagement, reputation, score, level, badge) arrays.
+    """
+    raw = (
+        np.log1p(followers) * ENGAGEMENT_WEIGHTS['followers'] +
+        np.log1p(likes) * ENGAGEMENT_WEIGHTS['likes'] +
+        np.log1p(comments) * ENGAGEMENT_WEIGHTS['comments']
+    )
+    engagement = np.clip(raw / ENGAGEMENT_MAX_EXPECTED, 0.0, 1.0)
+    ai = np.clip(ai_scores, 0.0, 1.0)
+    action_bonus = np.clip(action_points / Profile.ACTION_POINTS_CAP, 0.0, 1.0)
+
+    reputation = (
+        engagement * Profile.ENGAGEMENT_WEIGHT +
+        ai * Profile.AI_WEIGHT +
+        action_bonus * Profile.ACTION_WEIGHT
+    )
+    score = np.rint(reputation * 100).astype(np.int64)
+    level = np.clip(1 + np.floor(reputation * 9).astype(np.int64), 1, 10)
+    badge = np.select(
+        [level >= min_level for min_level, _ in Profile.LEVEL_BADGES],
+        [name for _, name in Profile.LEVEL_BADGES],
+        default='Novice'
+    )
+    return engagement, reputation, score, level, badge
+
+
+class Command(BaseCommand):
+    help = "Recompute engagement, reputation, score, level and badge for every profile in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Profiles written per bulk_update.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Show what would change without writing.')
+        parser.add_argument('--show', type=int, default=20,
+                            help='Changed profiles listed in a dry run.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        started = time.monotonic()
+
+        rows = list(
+            Profile.objects.order_by('id')
+            .values_list('id', 'user_id', 'ai_score', 'action_points',
+                         'engagement_score', 'reputation_score', 'score', 'level', 'badge')
+        )
+        if not rows:
+            self.stdout.write(self.style.SUCCESS("No profiles to recompute."))
+            return
+        ids, user_ids, ai, points, old_eng, old_rep, old_score, old_level, old_badge = zip(*rows)
+        user_ids = np.array(user_ids, dtype=np.int64)
+
+        follower_counts = _grouped_counts(Follow, 'following_id')
+        like_counts = _grouped_counts(Like, 'post__user_id')
+        comment_counts = _grouped_counts(Comment, 'post__user_id')
+
+        def aligned(counts):
+            return np.array([counts.get(uid, 0) for uid in user_ids.tolist()], dtype=np.float64)
+
+        engagement, reputation, score, level, badge = compute_reputations(
+            aligned(follower_counts),
+            aligned(like_counts),
+            aligned(comment_counts),
+            np.array(ai, dtype=np.float64),
+            np.array(points, dtype=np.float64),
+        )
+
+        changed = np.flatnonzero(
+            ~np.isclose(engagement, np.array(old_eng, dtype=np.float64)) |
+            ~np.isclose(reputation, np.array(old_rep, dtype=np.float64)) |
+            (score != np.array(old_score)) |
+            (level != np.array(old_level)) |
+            (badge != np.array(old_badge))
+        )
+        self.stdout.write(
+            f"computed {len(rows)} profiles in {time.monotonic() - started:.2f}s, {len(changed)} changed"
+        )
+
+        if options['dry_run']:
+            for i in changed[:options['show']].tolist():
+                self.stdout.write(
+                    f"  user {user_ids[i]}: reputation {old_rep[i]:.4f} -> {reputation[i]:.4f}, "
+                    f"score {old_score[i]} -> {score[i]}, level {old_level[i]} -> {level[i]}, "
+                    f"badge {old_badge[i]} -> {badge[i]}"
+                )
+            self.stdout.write(self.style.SUCCESS(f"Dry run: would update {len(changed)} of {len(rows)} profiles."))
+            return
+
+        now = timezone.now()
+        written = 0
+        write_started = time.monotonic()
+        for start in range(0, len(changed), chunk_size):
+            batch = [
+                Profile(
+                    id=ids[i],
+                    engagement_score=float(engagement[i]),
+                    reputation_score=float(reputation[i]),
+                    score=int(score[i]),
+                    level=int(level[i]),
+                    badge=str(badge[i]),
+                    last_recalc=now,
+                )
+                for i in changed[start:start + chunk_size].tolist()
+            ]
+            Profile.objects.bulk_update(batch, WRITE_FIELDS)
+            written += len(batch)
+            elapsed = time.monotonic() - write_started
+            rate = written / elapsed if elapsed else float(written)
+            self.stdout.write(f"updated {written}/{len(changed)} profiles ({rate:.0f}/s)")
+
+        if written:
+            invalidate_leaderboard()
+
+        total = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed {len(rows)} profiles, updated {written} in {total:.2f}s "
+            f"({len(rows) / total if total else len(rows):.0f} profiles/s)."
+        ))
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Comment, Follow, Like, Profile
+
+# counter field -> (source model, path from the source row to the counted user)
+COUNTER_SOURCES = {
+    'followers_count': (Follow, 'following_id'),
+    'likes_received_count': (Like, 'post__user_id'),
+    'comments_received_count': (Comment, 'post__user_id'),
+}
+
+
+class Command(BaseCommand):
+    help = "Recount Profile follower/likes/comments-received counters from the source tables and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Profiles checked (and locked) per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted profiles without writing.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        fields = list(COUNTER_SOURCES)
+
+        last_id = 0
+        checked = repaired = 0
+        while True:
+            with transaction.atomic():
+                profiles = list(
+                    Profile.objects.select_for_update()
+                    .filter(user_id__gt=last_id)
+                    .order_by('user_id')
+                    .only('id', 'user_id', *fields)[:chunk_size]
+                )
+                if not profiles:
+                    break
+                lo, hi = profiles[0].user_id, profiles[-1].user_id
+
+                actual = {}
+                for field, (model, user_path) in COUNTER_SOURCES.items():
+                    actual[field] = dict(
+                        model.objects.filter(**{f'{user_path}__gte': lo, f'{user_path}__lte': hi})
+                        .values(user_path)
+                        .annotate(n=Count('id'))
+                        .order_by()
+                        .values_list(user_path, 'n')
+                    )
+
+                drifted = []
+                for profile in profiles:
+                    changed = False
+                    for field in fields:
+                        n = actual[field].get(profile.user_id, 0)
+                        if getattr(profile, field) != n:
+                            setattr(profile, field, n)
+                            changed = True
+                    if changed:
+                        drifted.append(profile)
+
+                if drifted and not dry_run:
+                    Profile.objects.bulk_update(drifted, fields)
+
+            checked += len(profiles)
+            repaired += len(drifted)
+            last_id = hi
+            self.stdout.write(f"checked {checked} profiles, {repaired} drifted")
+
+        verb = 'would repair' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f"Done: {checked} profiles checked, {verb} {repaired}."))
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from core.models import Post
+from core.signals import POST_COUNTER_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Recount Post like/comment/bookmark counters from the source tables and repair drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Posts checked (and locked) per transaction.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted posts without writing.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        fields = list(POST_COUNTER_FIELDS.values())
+
+        last_id = 0
+        checked = repaired = 0
+        while True:
+            with transaction.atomic():
+                posts = list(
+                    Post.objects.select_for_update()
+                    .filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', *fields)[:chunk_size]
+                )
+                if not posts:
+                    break
+                lo, hi = posts[0].id, posts[-1].id
+
+                actual = {}
+                for model, field in POST_COUNTER_FIELDS.items():
+                    actual[field] = dict(
+                        model.objects.filter(post_id__gte=lo, post_id__lte=hi)
+                        .values('post_id')
+                        .annotate(n=Count('id'))
+                        .order_by()
+                        .values_list('post_id', 'n')
+                    )
+
+                drifted = []
+                for post in posts:
+                    changed = False
+                    for field in fields:
+                        n = actual[field].get(post.id, 0)
+                        if getattr(post, field) != n:
+                            setattr(post, field, n)
+                            changed = True
+                    if changed:
+                        drifted.append(post)
+
+                if drifted and not dry_run:
+                    Post.objects.bulk_update(drifted, fields)
+
+            checked += len(posts)
+            repaired += len(drifted)
+            last_id = hi
+            self.stdout.write(f"checked {checked} posts, {repaired} drifted")
+
+        verb = 'would repair' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f"Done: {checked} posts checked, {verb} {repaired}."))
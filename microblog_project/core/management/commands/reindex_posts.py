@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Post
+from core.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from published posts, streaming them in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Posts read and indexed per batch.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        backend = get_search_backend()
+        # searches keep seeing the old index until the new one commits
+        with transaction.atomic():
+            backend.clear()
+
+            posts = (
+                Post.objects.filter(status='published')
+                .select_related('user')
+                .only('id', 'content', 'status', 'user__username')
+                .order_by('id')
+            )
+
+            chunk = []
+            seen = 0
+            for post in posts.iterator(chunk_size=chunk_size):
+                chunk.append(post)
+                if len(chunk) >= chunk_size:
+                    backend.index_many(chunk)
+                    seen += len(chunk)
+                    chunk = []
+                    self.stdout.write(f"{seen} posts indexed...")
+            if chunk:
+                backend.index_many(chunk)
+                seen += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {seen} posts."))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.reputation import RECALC_BATCH_SIZE, RECALC_COALESCE_SECONDS, process_pending
+
+
+class Command(BaseCommand):
+    help = "Recalculate reputations of users marked dirty by signals, coalescing bursts per user."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=RECALC_BATCH_SIZE,
+                            help='Users recalculated per pass.')
+        parser.add_argument('--window', type=int, default=RECALC_COALESCE_SECONDS,
+                            help='Seconds to let events for a user pile up before recalculating.')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain what is due and exit instead of looping.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            done = process_pending(options['batch_size'], options['window'])
+            total += done
+            if done:
+                self.stdout.write(f"{total} reputations recalculated...")
+            if done == options['batch_size']:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Recalculated {total} reputations."))
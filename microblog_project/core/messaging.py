@@ -0,0 +1,207 @@
+"""Direct messages and the per-pair ``Conversation`` summaries behind the inbox.
+
+Each pair of users has one ``Conversation`` row (lower user id in ``user_a``)
+holding the last message, the time of the last activity and how many
+messages each side has not read. The row is updated in the same
+transaction as the ``Message`` insert (receiver in core.signals) and as the
+``is_read`` update when a side reads, so the inbox is a single indexed
+query per page instead of two queries per correspondent.
+
+A conversation is read newest-first in keyset pages on ``(created_at, id)``
+(core.pagination); new messages are fetched after a message id. Either way
+each direction is a range scan on the ``message_pair_created`` index.
+
+New messages and read receipts are published to the participants' open
+connections through core.realtime; the DM socket lives in core.sockets.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from .models import Conversation, Message
+from .pagination import after_cursor, decode_cursor, page_from_rows
+from .realtime import publish_on_commit
+
+INBOX_PAGE_SIZE = 20
+CONVERSATION_PAGE_SIZE = 50
+
+
+def ordered_pair(user_id, other_id):
+    return (user_id, other_id) if user_id <= other_id else (other_id, user_id)
+
+
+def _unread_field(conversation_pair, user_id):
+    return 'unread_a' if user_id == conversation_pair[0] else 'unread_b'
+
+
+def send_message(sender_id, recipient_id, content):
+    """Create a message; its conversation is updated in the same transaction.
+
+    Both participants' open connections get a ``message`` event on commit,
+    so the sender's other tabs show it too.
+    """
+    with transaction.atomic():
+        message = Message.objects.create(sender_id=sender_id, recipient_id=recipient_id, content=content)
+        event = {'type': 'message', 'message': message_payload(message)}
+        publish_on_commit(recipient_id, event)
+        if sender_id != recipient_id:
+            publish_on_commit(sender_id, event)
+    return message
+
+
+def record_message(message):
+    """Point the pair's conversation at ``message`` and count it as unread."""
+    pair = ordered_pair(message.sender_id, message.recipient_id)
+    unread_field = _unread_field(pair, message.recipient_id)
+    with transaction.atomic():
+        conversation, created = Conversation.objects.get_or_create(
+            user_a_id=pair[0], user_b_id=pair[1],
+            defaults={'last_message': message, 'last_activity': message.created_at, unread_field: 1},
+        )
+        if created:
+            return
+        rows = Conversation.objects.filter(pk=conversation.pk)
+        rows.update(**{unread_field: F(unread_field) + 1})
+        # a message committed out of order must not move the pointer back
+        rows.filter(last_activity__lte=message.created_at).update(
+            last_message=message, last_activity=message.created_at
+        )
+
+
+def mark_conversation_read(reader_id, other_id):
+    """Mark everything ``other`` sent to ``reader`` read and zero reader's counter.
+
+    ``other`` gets the same ``read`` event as from the socket path. Returns
+    the number of messages marked read.
+    """
+    pair = ordered_pair(reader_id, other_id)
+    unread_field = _unread_field(pair, reader_id)
+    with transaction.atomic():
+        # the row lock orders this against a concurrent record_message
+        conversation = (
+            Conversation.objects.select_for_update()
+            .filter(user_a_id=pair[0], user_b_id=pair[1])
+            .only('id')
+            .first()
+        )
+        if conversation is None:
+            return 0
+        ids = list(
+            Message.objects.filter(sender_id=other_id, recipient_id=reader_id, is_read=False)
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        Message.objects.filter(id__in=ids).update(is_read=True)
+        Conversation.objects.filter(pk=conversation.pk).update(**{unread_field: 0})
+        publish_on_commit(other_id, {'type': 'read', 'reader_id': reader_id, 'message_ids': ids})
+    return len(ids)
+
+
+def mark_messages_read(reader_id, message_ids):
+    """Mark a batch of messages addressed to ``reader`` read with one ``is_read`` update.
+
+    Decrements the reader's unread counter of each conversation involved and
+    tells every sender which of their messages were read. Returns the number
+    of messages marked read.
+    """
+    candidates = Message.objects.filter(id__in=message_ids, recipient_id=reader_id, is_read=False)
+    sender_ids = set(candidates.values_list('sender_id', flat=True))
+    if not sender_ids:
+        return 0
+    pairs = [ordered_pair(reader_id, sender_id) for sender_id in sender_ids]
+    with transaction.atomic():
+        # same lock order as mark_conversation_read: conversations, then messages
+        list(
+            Conversation.objects.select_for_update()
+            .filter(reduce(or_, (Q(user_a_id=a, user_b_id=b) for a, b in pairs)))
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        rows = list(candidates.values_list('id', 'sender_id'))
+        if not rows:
+            return 0
+        Message.objects.filter(id__in=[pk for pk, _ in rows]).update(is_read=True)
+
+        read_by_sender = {}
+        for pk, sender_id in rows:
+            read_by_sender.setdefault(sender_id, []).append(pk)
+        for sender_id, ids in read_by_sender.items():
+            pair = ordered_pair(reader_id, sender_id)
+            unread_field = _unread_field(pair, reader_id)
+            Conversation.objects.filter(user_a_id=pair[0], user_b_id=pair[1]).update(
+                **{unread_field: Greatest(F(unread_field) - len(ids), 0)}
+            )
+            publish_on_commit(sender_id, {'type': 'read', 'reader_id': reader_id, 'message_ids': ids})
+    return len(rows)
+
+
+def inbox_page(user_id, page, page_size=INBOX_PAGE_SIZE):
+    """Return ``(conversations, has_next)`` for a 1-based inbox page, newest first.
+
+    Each item is a dict with ``user`` (the other participant),
+    ``last_message`` and ``unread_count``.
+    """
+    offset = (page - 1) * page_size
+    rows = list(
+        Conversation.objects.filter(Q(user_a_id=user_id) | Q(user_b_id=user_id))
+        .select_related('user_a', 'user_b', 'last_message')
+        .order_by('-last_activity', '-id')[offset:offset + page_size + 1]
+    )
+    conversations = [
+        {
+            'user': c.other_user(user_id),
+            'last_message': c.last_message,
+            'unread_count': c.unread_for(user_id),
+        }
+        for c in rows[:page_size]
+    ]
+    return conversations, len(rows) > page_size
+
+
+def _thread(user_id, other_id):
+    return Message.objects.filter(
+        Q(sender_id=user_id, recipient_id=other_id) | Q(sender_id=other_id, recipient_id=user_id)
+    )
+
+
+def _cursor(thread, message_id):
+    """``(created_at, id)`` of a message in the thread, or None."""
+    return thread.filter(pk=message_id).values_list('created_at', 'id').first()
+
+
+def conversation_page(user_id, other_id, cursor=None, limit=CONVERSATION_PAGE_SIZE):
+    """The ``limit`` messages older than ``cursor`` (default: the latest ones).
+
+    Returns ``(messages, older_cursor)`` with messages oldest first;
+    ``older_cursor`` is the token for the previous page (core.pagination),
+    or None at the start of the conversation.
+    """
+    thread = after_cursor(_thread(user_id, other_id), decode_cursor(cursor) if cursor else None)
+    rows, older_cursor = page_from_rows(list(thread.order_by('-created_at', '-id')[:limit + 1]), limit)
+    return rows[::-1], older_cursor
+
+
+def messages_since(user_id, other_id, since=None, limit=CONVERSATION_PAGE_SIZE):
+    """Up to ``limit`` messages after message ``since`` (or from the start), oldest first."""
+    thread = _thread(user_id, other_id)
+    if since is not None:
+        cursor = _cursor(thread, since)
+        if cursor is None:
+            return []
+        created_at, pk = cursor
+        thread = thread.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    return list(thread.order_by('created_at', 'id')[:limit])
+
+
+def message_payload(message):
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'recipient_id': message.recipient_id,
+        'content': message.content,
+        'created_at': message.created_at.isoformat(),
+    }
@@ -0,0 +1,15 @@
+from .viewer import ViewerContext
+
+
+class ViewerContextMiddleware:
+    """Attach a per-request ``ViewerContext`` as ``request.viewer``.
+
+    Must run after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.viewer = ViewerContext(request)
+        return self.get_response(request)
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 09:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_hashtag_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posthashtag',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='HashtagBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('hashtag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='core.hashtag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket_start'], name='hashtag_bucket_start')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='hashtagbucket',
+            constraint=models.UniqueConstraint(fields=('hashtag', 'bucket_start'), name='unique_hashtag_bucket'),
+        ),
+    ]
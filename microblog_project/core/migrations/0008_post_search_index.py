@@ -0,0 +1,65 @@
+from django.db import migrations
+
+PG_FORWARD = [
+    "ALTER TABLE core_post ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    """
+    UPDATE core_post p
+    SET search_vector = setweight(to_tsvector('english', u.username), 'A') ||
+                        setweight(to_tsvector('english', p.content), 'B')
+    FROM auth_user u
+    WHERE u.id = p.user_id AND p.status = 'published'
+    """,
+    "CREATE INDEX IF NOT EXISTS core_post_search_vector_gin ON core_post USING GIN (search_vector)",
+]
+PG_REVERSE = [
+    "DROP INDEX IF EXISTS core_post_search_vector_gin",
+    "ALTER TABLE core_post DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_post_fts "
+    "USING fts5(content, username, tokenize='porter unicode61')",
+    """
+    INSERT INTO core_post_fts(rowid, content, username)
+    SELECT p.id, p.content, u.username
+    FROM core_post p JOIN auth_user u ON u.id = p.user_id
+    WHERE p.status = 'published'
+    """,
+]
+SQLITE_REVERSE = ["DROP TABLE IF EXISTS core_post_fts"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, PG_FORWARD)
+    elif vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except Exception:
+            # SQLite built without FTS5: search falls back to icontains
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, PG_REVERSE)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_post_hot_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
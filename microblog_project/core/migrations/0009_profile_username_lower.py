@@ -0,0 +1,30 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Lower
+
+
+def populate_username_lower(apps, schema_editor):
+    Profile = apps.get_model('core', 'Profile')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    usernames = User.objects.filter(pk=OuterRef('user_id')).values('username')[:1]
+    Profile.objects.update(username_lower=Lower(Subquery(usernames)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_post_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='username_lower',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=150),
+        ),
+        migrations.RunPython(populate_username_lower, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0009_profile_username_lower'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingReputationRecalc',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pending_reputation', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('ai_score', models.FloatField(blank=True, null=True)),
+                ('first_marked_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
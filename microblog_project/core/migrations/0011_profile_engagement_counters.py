@@ -0,0 +1,50 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Profile = apps.get_model('core', 'Profile')
+    sources = (
+        ('Follow', 'following', 'followers_count'),
+        ('Like', 'post__user', 'likes_received_count'),
+        ('Comment', 'post__user', 'comments_received_count'),
+    )
+    for model_name, user_path, field in sources:
+        model = apps.get_model('core', model_name)
+        counts = (
+            model.objects.filter(**{user_path: OuterRef('user_id')})
+            .order_by()
+            .values(user_path)
+            .annotate(n=Count('id'))
+            .values('n')
+        )
+        Profile.objects.update(**{field: Coalesce(Subquery(counts), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_pending_reputation_recalc'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='comments_received_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='likes_received_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
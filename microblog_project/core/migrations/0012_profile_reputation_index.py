@@ -0,0 +1,19 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_profile_engagement_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['-reputation_score'], name='profile_reputation'),
+        ),
+    ]
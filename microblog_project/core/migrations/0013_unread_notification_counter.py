@@ -0,0 +1,40 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_unread_counts(apps, schema_editor):
+    Profile = apps.get_model('core', 'Profile')
+    Notification = apps.get_model('core', 'Notification')
+    counts = (
+        Notification.objects.filter(recipient=OuterRef('user_id'), is_read=False)
+        .order_by()
+        .values('recipient')
+        .annotate(n=Count('id'))
+        .values('n')
+    )
+    Profile.objects.update(unread_notifications_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_profile_reputation_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread'),
+        ),
+        migrations.RunPython(populate_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_notification_groups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('sender_id', models.BigIntegerField()),
+                ('recipient_id', models.BigIntegerField(db_index=True)),
+                ('notification_type', models.CharField(max_length=20)),
+                ('post_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_count', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_conversations(apps, schema_editor):
+    Conversation = apps.get_model('core', 'Conversation')
+    Message = apps.get_model('core', 'Message')
+    # one pass over the messages, oldest first, keeping per-pair state
+    pairs = {}
+    rows = Message.objects.order_by('created_at', 'id').values_list(
+        'id', 'sender_id', 'recipient_id', 'created_at', 'is_read'
+    )
+    for message_id, sender_id, recipient_id, created_at, is_read in rows.iterator(chunk_size=2000):
+        a, b = sorted((sender_id, recipient_id))
+        conversation = pairs.setdefault((a, b), Conversation(user_a_id=a, user_b_id=b))
+        conversation.last_message_id = message_id
+        conversation.last_activity = created_at
+        if not is_read:
+            if recipient_id == a:
+                conversation.unread_a += 1
+            else:
+                conversation.unread_b += 1
+    Conversation.objects.bulk_create(pairs.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_notification_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_activity', models.DateTimeField(default=django.utils.timezone.now)),
+                ('unread_a', models.PositiveIntegerField(default=0)),
+                ('unread_b', models.PositiveIntegerField(default=0)),
+                ('last_message', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.message')),
+                ('user_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_a', '-last_activity'], name='conversation_a_inbox'), models.Index(fields=['user_b', '-last_activity'], name='conversation_b_inbox')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(fields=('user_a', 'user_b'), name='conversation_pair'),
+        ),
+        migrations.RunPython(populate_conversations, migrations.RunPython.noop),
+    ]
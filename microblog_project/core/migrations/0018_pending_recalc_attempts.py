@@ -0,0 +1,18 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_message_pair_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pendingreputationrecalc',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
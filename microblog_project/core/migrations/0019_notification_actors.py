@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_actors(apps, schema_editor):
+    Notification = apps.get_model('core', 'Notification')
+    NotificationActor = apps.get_model('core', 'NotificationActor')
+    # only the latest actor of existing groups is known
+    rows = Notification.objects.order_by('id').values_list('id', 'sender_id')
+    batch = []
+    for notification_id, sender_id in rows.iterator(chunk_size=2000):
+        batch.append(NotificationActor(notification_id=notification_id, user_id=sender_id))
+        if len(batch) >= 2000:
+            NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_pending_recalc_attempts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='core.notification')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='notificationactor',
+            constraint=models.UniqueConstraint(fields=('notification', 'user'), name='unique_notification_actor'),
+        ),
+        migrations.RunPython(populate_actors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# core.timeline.FANOUT_FOLLOWER_LIMIT: posts of larger audiences are merged on read
+FANOUT_FOLLOWER_LIMIT = 5000
+
+
+def populate_timelines(apps, schema_editor):
+    """Fan every published post out the way core.timeline.fan_out_post does."""
+    Follow = apps.get_model('core', 'Follow')
+    Post = apps.get_model('core', 'Post')
+    TimelineEntry = apps.get_model('core', 'TimelineEntry')
+
+    # posts grouped by author, so each author's followers are read once
+    rows = (
+        Post.objects.filter(status='published')
+        .order_by('user_id', 'id')
+        .values_list('id', 'user_id', 'created_at')
+    )
+    author_id = None
+    follower_ids = []
+    batch = []
+    for post_id, user_id, created_at in rows.iterator(chunk_size=2000):
+        if user_id != author_id:
+            author_id = user_id
+            follower_ids = list(Follow.objects.filter(following_id=user_id).values_list('follower_id', flat=True))
+            if len(follower_ids) >= FANOUT_FOLLOWER_LIMIT:
+                follower_ids = []
+        for reader_id in [user_id, *follower_ids]:
+            batch.append(TimelineEntry(user_id=reader_id, post_id=post_id, created_at=created_at))
+        if len(batch) >= 1000:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_notification_actors'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_timelines, migrations.RunPython.noop),
+    ]
@@ -32,9 +32,111 @@ class Post(models.Model):
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="published")
     created_at = models.DateTimeField(default=timezone.now)
 
+    # denormalized counters, maintained with F() updates by core.signals and
+    # repaired by the recount_post_counters command
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    bookmark_count = models.PositiveIntegerField(default=0)
+    # time-decayed popularity, see core.ranking
+    hot_score = models.FloatField(default=0.0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-created_at'], name='post_status_recent'),
+            models.Index(fields=['user', 'status', '-created_at'], name='post_user_status_recent'),
+            models.Index(fields=['status', '-hot_score'], name='post_status_hot'),
+        ]
+
+    # written only with F()/queryset updates (hot_score by core.ranking); full
+    # saves of a possibly stale instance must not overwrite them
+    COUNTER_FIELDS = ('like_count', 'comment_count', 'bookmark_count', 'hot_score')
+
     def __str__(self):
         return f"{self.user.username} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember the stored status so saves can detect draft <-> published transitions
+        if 'status' in field_names:
+            instance._loaded_status = values[field_names.index('status')]
+        return instance
+
+
+class TimelineEntry(models.Model):
+    """A published post materialized into one user's home timeline.
+
+    Rows are written by fan-out when a post is published (see core.timeline);
+    created_at mirrors the post's so a feed page is a single range scan on
+    (user, created_at, post). Deleting the post or the user cascades here.
+    """
+    user = models.ForeignKey(AUTH_USER, related_name='timeline_entries', on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, related_name='timeline_entries', on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_recent'),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id} in {self.user_id}'s timeline"
+
+
+class Hashtag(models.Model):
+    name = models.CharField(max_length=100, unique=True)  # stored lowercase, without '#'
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class PostHashtag(models.Model):
+    """Hashtag index row for a published post, kept in sync by core.hashtags."""
+    post = models.ForeignKey(Post, related_name='post_hashtags', on_delete=models.CASCADE)
+    hashtag = models.ForeignKey(Hashtag, related_name='post_hashtags', on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=timezone.now)  # when the tag was indexed
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hashtag', 'post'], name='unique_post_hashtag')
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag} on post {self.post_id}"
+
+
+class HashtagBucket(models.Model):
+    """Number of posts tagged with a hashtag during one hour.
+
+    Trending sums the buckets of the last few hours, so its cost depends on
+    the number of distinct active tags, not on post volume.
+    """
+    hashtag = models.ForeignKey(Hashtag, related_name='buckets', on_delete=models.CASCADE)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['hashtag', 'bucket_start'], name='unique_hashtag_bucket')
+        ]
+        indexes = [
+            models.Index(fields=['bucket_start'], name='hashtag_bucket_start'),
+        ]
+
+    def __str__(self):
+        return f"{self.hashtag} @ {self.bucket_start:%Y-%m-%d %H}:00 = {self.count}"
+
 
 class Like(models.Model):
     user = models.ForeignKey(AUTH_USER, on_delete=models.CASCADE)
@@ -92,18 +194,64 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # each direction of a conversation is a range scan on this index
+            models.Index(fields=['sender', 'recipient', 'created_at'], name='message_pair_created'),
+        ]
 
     def __str__(self):
         return f"From {self.sender.username} to {self.recipient.username}"
 
 
+class Conversation(models.Model):
+    """Inbox summary for one pair of users (see core.messaging).
+
+    ``user_a`` is always the participant with the lower id; the unread
+    counters are the messages each participant has not read yet.
+    """
+    user_a = models.ForeignKey(AUTH_USER, related_name='+', on_delete=models.CASCADE)
+    user_b = models.ForeignKey(AUTH_USER, related_name='+', on_delete=models.CASCADE)
+    last_message = models.ForeignKey(Message, null=True, blank=True, related_name='+', on_delete=models.SET_NULL)
+    last_activity = models.DateTimeField(default=timezone.now)
+    unread_a = models.PositiveIntegerField(default=0)
+    unread_b = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_a', 'user_b'], name='conversation_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['user_a', '-last_activity'], name='conversation_a_inbox'),
+            models.Index(fields=['user_b', '-last_activity'], name='conversation_b_inbox'),
+        ]
+
+    def other_user(self, user_id):
+        return self.user_b if user_id == self.user_a_id else self.user_a
+
+    def unread_for(self, user_id):
+        return self.unread_a if user_id == self.user_a_id else self.unread_b
+
+    def __str__(self):
+        return f"Conversation {self.user_a_id} <-> {self.user_b_id}"
+
+
 class Profile(models.Model):
     user = models.OneToOneField(AUTH_USER, related_name='profile', on_delete=models.CASCADE)
     photo = models.ImageField(upload_to='profile_photos/', default='profile_photos/default.png', blank=True, null=True)
     bio = models.TextField(max_length=160, blank=True, default='')
+    # lowercased copy of user.username for indexed prefix lookups (typeahead)
+    username_lower = models.CharField(max_length=150, blank=True, default='', db_index=True)
 
     action_points = models.IntegerField(default=0)
 
+    # denormalized engagement inputs, maintained with F() updates by
+    # core.signals and repaired by the reconcile_profile_counters command
+    followers_count = models.PositiveIntegerField(default=0)
+    likes_received_count = models.PositiveIntegerField(default=0)
+    comments_received_count = models.PositiveIntegerField(default=0)
+    # unread notifications; see core.notifications
+    unread_notifications_count = models.PositiveIntegerField(default=0)
+
     ai_score = models.FloatField(default=0.0)
     engagement_score = models.FloatField(default=0.0)
     reputation_score = models.FloatField(default=0.0)
@@ -112,18 +260,43 @@ class Profile(models.Model):
     badge = models.CharField(max_length=32, default='Novice')
     last_recalc = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-reputation_score'], name='profile_reputation'),
+        ]
+
     def __str__(self):
         return self.user.username
 
+    # written only with F() updates; full saves of a possibly stale instance
+    # must not overwrite them
+    COUNTER_FIELDS = (
+        'action_points', 'followers_count', 'likes_received_count', 'comments_received_count',
+        'unread_notifications_count',
+    )
+
+    def save(self, *args, **kwargs):
+        self.username_lower = self.user.username.lower()
+        if not self._state.adding and kwargs.get('update_fields') is None and not args:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    # reputation weights: engagement 65% / ai 25% / action_bonus 10%
+    ENGAGEMENT_WEIGHT = 0.65
+    AI_WEIGHT = 0.25
+    ACTION_WEIGHT = 0.10
+    # action points that earn the full action bonus
+    ACTION_POINTS_CAP = 100.0
+    # (minimum level, badge), highest first
+    LEVEL_BADGES = ((9, 'Elite'), (7, 'Star'), (5, 'Influencer'), (3, 'Contributor'))
+
     def _badge_from_level(self, lvl: int) -> str:
-        if lvl >= 9:
-            return 'Elite'
-        if lvl >= 7:
-            return 'Star'
-        if lvl >= 5:
-            return 'Influencer'
-        if lvl >= 3:
-            return 'Contributor'
+        for min_level, badge in self.LEVEL_BADGES:
+            if lvl >= min_level:
+                return badge
         return 'Novice'
 
     def recalc_hybrid_reputation(self, ai_score=None, engagement_score=None, save=True):
@@ -144,10 +317,13 @@ class Profile(models.Model):
             self.engagement_score = max(0.0, min(1.0, e))
 
         # incorporate action points as a small bonus (normalize action_points -> 0.0-1.0)
-        action_bonus = max(0.0, min(1.0, float(self.action_points or 0) / 100.0))
+        action_bonus = max(0.0, min(1.0, float(self.action_points or 0) / self.ACTION_POINTS_CAP))
 
-        # weights: engagement 65% / ai 25% / action_bonus 10%
-        self.reputation_score = float((self.engagement_score * 0.65) + (self.ai_score * 0.25) + (action_bonus * 0.10))
+        self.reputation_score = float(
+            (self.engagement_score * self.ENGAGEMENT_WEIGHT) +
+            (self.ai_score * self.AI_WEIGHT) +
+            (action_bonus * self.ACTION_WEIGHT)
+        )
         self.score = int(round(self.reputation_score * 100))
         self.level = max(1, min(10, 1 + int(self.reputation_score * 9)))
         self.badge = self._badge_from_level(self.level)
@@ -157,7 +333,7 @@ class Profile(models.Model):
             try:
                 self.save(update_fields=[
                     'ai_score', 'engagement_score', 'reputation_score',
-                    'score', 'level', 'badge', 'last_recalc', 'action_points'
+                    'score', 'level', 'badge', 'last_recalc'
                 ])
             except Exception:
                 self.save()
@@ -227,6 +403,20 @@ class Profile(models.Model):
         return "Beginner"
 
 
+class PendingReputationRecalc(models.Model):
+    """A user whose reputation is due for recalculation (see core.reputation)."""
+    user = models.OneToOneField(AUTH_USER, primary_key=True, related_name='pending_reputation', on_delete=models.CASCADE)
+    # quality of the user's latest post, applied with the next recalc
+    ai_score = models.FloatField(null=True, blank=True)
+    first_marked_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_marked_at = models.DateTimeField(default=timezone.now)
+    # failed recalculations so far; the row is dropped after RECALC_MAX_ATTEMPTS
+    attempts = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"reputation recalc pending for {self.user_id}"
+
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = (('follow', 'Follow'), ('like', 'Like'), ('comment', 'Comment'))
 
@@ -237,17 +427,68 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
 
+    # grouping: one row per (recipient, type, post, time bucket), updated in
+    # place as more people act; ``sender`` is the most recent of them
+    group_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread'),
+        ]
+
+    @property
+    def others_count(self):
+        return self.actor_count - 1
+
     def __str__(self):
         return f"{self.sender} → {self.recipient} ({self.notification_type})"
 
     def get_redirect_url(self):
-        if self.notification_type in ["like", "comment"] and self.post:
-            return f"/posts/{self.post.id}/"
+        if self.notification_type in ["like", "comment"] and self.post_id:
+            return f"/posts/{self.post_id}/"
         if self.notification_type == "follow":
             return f"/profile/{self.sender.username}/"
         return "#"
 
 
+class NotificationActor(models.Model):
+    """One distinct user who acted on a grouped ``Notification``.
+
+    ``Notification.actor_count`` is bumped only when a row is inserted here,
+    so repeat actions by the same user are not counted twice.
+    """
+    notification = models.ForeignKey(Notification, related_name='actors', on_delete=models.CASCADE)
+    user = models.ForeignKey(AUTH_USER, related_name='+', on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'user'], name='unique_notification_actor')
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on notification {self.notification_id}"
+
+
+class NotificationArchive(models.Model):
+    """Read notifications moved out of ``Notification`` by prune_notifications.
+
+    Keeps the original primary key and plain ids (no foreign keys), so rows
+    can be copied in bulk without touching the live tables again.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    sender_id = models.BigIntegerField()
+    recipient_id = models.BigIntegerField(db_index=True)
+    notification_type = models.CharField(max_length=20)
+    post_id = models.BigIntegerField(null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"archived {self.notification_type} for {self.recipient_id}"
+
+
 class Community(models.Model):
     name = models.CharField(max_length=120, unique=True)
     description = models.TextField(blank=True)
@@ -0,0 +1,151 @@
+"""Notification helpers: grouped creation and the per-user unread counter.
+
+Likes, comments and follows are coalesced into one ``Notification`` per
+(recipient, type, post, NOTIFICATION_BUCKET_HOURS bucket), identified by a
+unique ``group_key`` and updated in place ("alice and 41 others liked your
+post").
+
+``Profile.unread_notifications_count`` is bumped by the Notification
+receivers in core.signals and reset when the user reads their
+notifications. Reads go through the cache, so the navbar badge costs no
+query on most requests.
+
+Every new or updated group is pushed to the recipient's open connections
+(see core.realtime) once the transaction commits.
+
+Read notifications older than NOTIFICATION_RETENTION_DAYS are deleted (or
+moved to ``NotificationArchive``) by the prune_notifications command.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Notification, NotificationActor, NotificationArchive, Profile
+from .realtime import get_fanout
+
+UNREAD_CACHE_TTL = 300
+# activity on the same post (or follows) within this window shares a row
+NOTIFICATION_BUCKET_HOURS = 24
+NOTIFICATION_RETENTION_DAYS = 90
+NOTIFICATIONS_PAGE_SIZE = 30
+
+
+def _unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    """The user's unread notification count (cached)."""
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = (
+            Profile.objects.filter(user_id=user_id)
+            .values_list('unread_notifications_count', flat=True)
+            .first()
+        ) or 0
+        cache.set(key, count, UNREAD_CACHE_TTL)
+    return count
+
+
+def bump_unread(user_id, delta):
+    Profile.objects.filter(user_id=user_id).update(
+        unread_notifications_count=Greatest(F('unread_notifications_count') + delta, 0)
+    )
+    cache.delete(_unread_key(user_id))
+
+
+def mark_all_read(user_id):
+    """Mark every notification of the user read and zero the counter."""
+    Notification.objects.filter(recipient_id=user_id, is_read=False).update(is_read=True)
+    Profile.objects.filter(user_id=user_id).update(unread_notifications_count=0)
+    cache.set(_unread_key(user_id), 0, UNREAD_CACHE_TTL)
+
+
+def mark_read(notification):
+    """Mark one notification read, keeping the counter in step."""
+    if Notification.objects.filter(pk=notification.pk, is_read=False).update(is_read=True):
+        bump_unread(notification.recipient_id, -1)
+    notification.is_read = True
+
+
+def prune_read_range(lo, hi, cutoff, archive=False):
+    """Delete read notifications older than ``cutoff`` with ``lo <= pk < hi``.
+
+    Runs in one short transaction; with ``archive`` the rows are copied to
+    ``NotificationArchive`` first. Returns the number of rows removed.
+    """
+    expired = Notification.objects.filter(pk__gte=lo, pk__lt=hi, is_read=True, created_at__lt=cutoff)
+    with transaction.atomic():
+        if archive:
+            rows = list(expired.values(
+                'id', 'sender_id', 'recipient_id', 'notification_type', 'post_id', 'actor_count', 'created_at'
+            ))
+            if not rows:
+                return 0
+            NotificationArchive.objects.bulk_create(
+                [NotificationArchive(**row) for row in rows], ignore_conflicts=True
+            )
+            expired = expired.filter(pk__in=[row['id'] for row in rows])
+        # only read rows go, so the unread counter is unaffected
+        deleted, _ = expired.delete()
+    return deleted
+
+
+def group_key(recipient_id, notification_type, post_id, when):
+    hours = int(when.timestamp() // 3600)
+    bucket = hours - hours % NOTIFICATION_BUCKET_HOURS
+    return f"{recipient_id}:{notification_type}:{post_id or 0}:{bucket}"
+
+
+def notify(recipient_id, sender_id, notification_type, post_id=None):
+    """Record that ``sender`` did ``notification_type`` to ``recipient``.
+
+    Creates the group row or folds the sender into it. ``actor_count`` counts
+    distinct actors (``NotificationActor`` rows), so a repeat by someone
+    already in the group, e.g. a second comment or an unlike and like again,
+    only makes them the latest actor. A group the recipient already read is
+    reopened by a new actor.
+    """
+    if recipient_id == sender_id:
+        return None
+
+    now = timezone.now()
+    key = group_key(recipient_id, notification_type, post_id, now)
+    notification, created = Notification.objects.get_or_create(
+        group_key=key,
+        defaults={
+            'recipient_id': recipient_id,
+            'sender_id': sender_id,
+            'notification_type': notification_type,
+            'post_id': post_id,
+            'created_at': now,
+        }
+    )
+    _, new_actor = NotificationActor.objects.get_or_create(notification=notification, user_id=sender_id)
+    if not created:
+        group = Notification.objects.filter(pk=notification.pk)
+        if new_actor:
+            changes = {'sender_id': sender_id, 'actor_count': F('actor_count') + 1, 'created_at': now}
+            if group.filter(is_read=True).update(is_read=False, **changes):
+                bump_unread(recipient_id, 1)
+            else:
+                group.update(**changes)
+        else:
+            # a repeat: they become the latest actor, nothing to count or push
+            group.exclude(sender_id=sender_id).update(sender_id=sender_id, created_at=now)
+            return notification
+
+    transaction.on_commit(lambda: push_notification(recipient_id, notification.id))
+    return notification
+
+
+def push_notification(recipient_id, notification_id):
+    """Tell the recipient's open connections about a new/updated notification."""
+    get_fanout().publish(recipient_id, {
+        'type': 'notification',
+        'id': notification_id,
+        'unread': unread_count(recipient_id),
+    })
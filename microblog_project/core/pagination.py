@@ -0,0 +1,58 @@
+"""Keyset (cursor) pagination helpers.
+
+Feeds are ordered newest first on ``(created_at, id)``. Instead of an OFFSET,
+each page hands the client an opaque cursor holding the sort key of the last
+row it rendered; the next page is a range scan that starts right after it.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+FEED_PAGE_SIZE = 20
+
+
+def encode_cursor(created_at, pk):
+    """Return an opaque, url-safe token for the row ``(created_at, pk)``."""
+    raw = f"{created_at.isoformat()}|{int(pk)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token from ``encode_cursor``.
+
+    Returns ``(created_at, pk)`` or ``None`` when the token is missing or was
+    tampered with, so callers simply fall back to the first page.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        created_at, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def after_cursor(queryset, cursor, created_field='created_at', id_field='id'):
+    """Filter ``queryset`` to rows strictly older than ``cursor``."""
+    if cursor is None:
+        return queryset
+    created_at, pk = cursor
+    return queryset.filter(
+        Q(**{f'{created_field}__lt': created_at}) |
+        Q(**{created_field: created_at, f'{id_field}__lt': pk})
+    )
+
+
+def page_from_rows(rows, page_size=FEED_PAGE_SIZE):
+    """Trim already-sorted ``rows`` to a page and build the next cursor."""
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
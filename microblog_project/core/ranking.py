@@ -0,0 +1,45 @@
+"""Time-decayed "hot" score for posts.
+
+score = (likes + COMMENT_WEIGHT * comments) / (age_hours + 2) ** HOT_GRAVITY
+
+The score is stored on Post (indexed) and refreshed whenever a like or
+comment arrives; recompute_hot_scores re-applies the decay periodically so
+stale posts sink even without new activity.
+"""
+from django.utils import timezone
+
+from .models import Post
+
+HOT_GRAVITY = 1.8
+COMMENT_WEIGHT = 2
+# posts older than this are decayed one last time and then left alone
+HOT_WINDOW_DAYS = 7
+TRENDING_POSTS_LIMIT = 5
+
+
+def hot_score(like_count, comment_count, created_at, now=None):
+    now = now or timezone.now()
+    age_hours = max(0.0, (now - created_at).total_seconds() / 3600.0)
+    points = (like_count or 0) + COMMENT_WEIGHT * (comment_count or 0)
+    return points / ((age_hours + 2) ** HOT_GRAVITY)
+
+
+def refresh_hot_score(post_id):
+    """Recompute one post's score from its current counters."""
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list('like_count', 'comment_count', 'created_at')
+        .first()
+    )
+    if row is None:
+        return
+    Post.objects.filter(pk=post_id).update(hot_score=hot_score(*row))
+
+
+def trending_posts(limit=TRENDING_POSTS_LIMIT):
+    """Published posts ordered by hot score (top-K read on the hot index)."""
+    return (
+        Post.objects.filter(status='published')
+        .select_related('user')
+        .order_by('-hot_score', '-created_at')[:limit]
+    )
@@ -0,0 +1,77 @@
+"""Fan-out of real-time events to connected users.
+
+Streaming endpoints subscribe per user; application code publishes events
+(plain JSON-able dicts) for a user id. The backend is chosen by
+``settings.REALTIME_FANOUT_BACKEND``. ``InMemoryFanout`` only reaches
+clients connected to the same process, which is enough for a single node
+and for tests; a multi-node deployment plugs in a broker-backed class with
+the same ``subscribe`` / ``publish`` methods.
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+DEFAULT_FANOUT_BACKEND = 'core.realtime.InMemoryFanout'
+# events buffered per connection before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class InMemoryFanout:
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        """Yield an ``asyncio.Queue`` receiving the user's events until exit."""
+        entry = (asyncio.get_running_loop(), asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(entry)
+        try:
+            yield entry[1]
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(user_id, set())
+                subscribers.discard(entry)
+                if not subscribers:
+                    self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event):
+        """Deliver ``event`` to every connection of ``user_id``; safe from any thread."""
+        with self._lock:
+            targets = list(self._subscribers.get(user_id, ()))
+        for loop, queue in targets:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    def connection_count(self, user_id):
+        with self._lock:
+            return len(self._subscribers.get(user_id, ()))
+
+
+def _offer(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+_fanout = None
+_fanout_lock = threading.Lock()
+
+
+def get_fanout():
+    global _fanout
+    if _fanout is None:
+        with _fanout_lock:
+            if _fanout is None:
+                path = getattr(settings, 'REALTIME_FANOUT_BACKEND', DEFAULT_FANOUT_BACKEND)
+                _fanout = import_string(path)()
+    return _fanout
+
+
+def publish_on_commit(user_id, event):
+    """Publish once the current transaction commits (immediately outside one)."""
+    transaction.on_commit(lambda: get_fanout().publish(user_id, event))
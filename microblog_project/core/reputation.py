@@ -0,0 +1,99 @@
+"""Deferred, coalesced reputation recalculation.
+
+Signals only mark users as dirty (one upserted ``PendingReputationRecalc``
+row per user). ``run_reputation_worker`` recalculates users whose first mark
+is at least ``RECALC_COALESCE_SECONDS`` old, so a burst of likes on one post
+becomes a single recalculation of the author. With
+``settings.REPUTATION_RECALC_INLINE`` the recalculation happens immediately
+instead (tests, local debugging).
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .leaderboard import note_reputation_change
+from .models import PendingReputationRecalc, Profile
+from .utils import profile_engagement_score
+
+logger = logging.getLogger(__name__)
+
+# events for one user within this window share a single recalculation
+RECALC_COALESCE_SECONDS = 30
+RECALC_BATCH_SIZE = 200
+# a user whose recalc keeps failing is retried after another window, then given up
+RECALC_MAX_ATTEMPTS = 5
+
+
+def add_action_points(user_id, points):
+    Profile.objects.filter(user_id=user_id).update(action_points=F('action_points') + points)
+
+
+def recalc_user(user_id, ai_score=None):
+    """Recalculate one user's reputation from the current counts."""
+    profile = Profile.objects.select_related('user').filter(user_id=user_id).first()
+    if profile is None:
+        return
+    engagement = profile_engagement_score(profile)
+    old_score = profile.reputation_score
+    profile.recalc_hybrid_reputation(engagement_score=engagement, ai_score=ai_score)
+    note_reputation_change(user_id, old_score, profile.reputation_score)
+
+
+def schedule_recalc(user_ids, ai_score=None):
+    """Mark ``user_ids`` dirty (or recalc now in inline mode).
+
+    ``ai_score`` is the quality of a just-created post; it is kept on the
+    pending row until the worker applies it.
+    """
+    user_ids = {uid for uid in user_ids if uid}
+    if not user_ids:
+        return
+
+    if getattr(settings, 'REPUTATION_RECALC_INLINE', False):
+        for uid in user_ids:
+            try:
+                recalc_user(uid, ai_score=ai_score)
+            except Exception:
+                logger.exception('Failed to recalc reputation for user %s', uid)
+        return
+
+    now = timezone.now()
+    update_fields = ['last_marked_at'] if ai_score is None else ['last_marked_at', 'ai_score']
+    PendingReputationRecalc.objects.bulk_create(
+        [PendingReputationRecalc(user_id=uid, ai_score=ai_score, first_marked_at=now, last_marked_at=now)
+         for uid in user_ids],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=update_fields
+    )
+
+
+def process_pending(batch_size=RECALC_BATCH_SIZE, coalesce_seconds=RECALC_COALESCE_SECONDS):
+    """Recalculate one batch of users whose window has closed; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=coalesce_seconds)
+    pending = list(
+        PendingReputationRecalc.objects.filter(first_marked_at__lte=cutoff)
+        .order_by('first_marked_at')
+        .values_list('user_id', 'ai_score', 'last_marked_at', 'attempts')[:batch_size]
+    )
+
+    for user_id, ai_score, last_marked_at, attempts in pending:
+        try:
+            recalc_user(user_id, ai_score=ai_score)
+        except Exception:
+            logger.exception('Failed to recalc reputation for user %s', user_id)
+            row = PendingReputationRecalc.objects.filter(user_id=user_id)
+            if attempts + 1 >= RECALC_MAX_ATTEMPTS:
+                logger.error('Giving up reputation recalc for user %s after %s attempts', user_id, attempts + 1)
+                row.delete()
+            else:
+                # move it behind the rest so it cannot block the head of every batch
+                row.update(attempts=F('attempts') + 1, first_marked_at=timezone.now())
+            continue
+        # a mark that arrived while we were working keeps the row for the next pass
+        PendingReputationRecalc.objects.filter(user_id=user_id, last_marked_at=last_marked_at).delete()
+
+    return len(pending)
@@ -0,0 +1,336 @@
+"""Full-text search over published posts.
+
+Two index backends, picked from the database vendor:
+
+* PostgreSQL: a ``search_vector`` tsvector column on core_post (username
+  weighted above content) with a GIN index, ranked by ``ts_rank``.
+* SQLite: an FTS5 virtual table ``core_post_fts`` keyed by post id, ranked
+  by ``bm25``; used for local and test runs.
+
+Both are created by migration 0008. Other databases fall back to the old
+``icontains`` scan. The index is kept current by the Post receivers in
+core.signals; ``reindex_posts`` rebuilds it from scratch.
+
+Username typeahead is a prefix range scan on the indexed
+``Profile.username_lower`` column, fronted by a small per-process LRU.
+
+Result pages of the search view are cached as lists of post ids, keyed on
+the normalized query and page; hashtag pages are invalidated by bumping a
+per-tag version whenever a post gains or loses that tag.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from .models import Post, Profile
+
+SEARCH_PAGE_SIZE = 20
+
+POST_TABLE = Post._meta.db_table
+USER_TABLE = get_user_model()._meta.db_table
+FTS_TABLE = 'core_post_fts'
+
+SEARCH_CACHE_TTL = 60
+SEARCH_CACHE_PREFIX = 'search:results'
+TAG_VERSION_PREFIX = 'search:tag_version'
+
+TYPEAHEAD_LIMIT = 8
+# hot prefixes kept per process, and for how long (seconds)
+TYPEAHEAD_CACHE_SIZE = 512
+TYPEAHEAD_TTL = 30
+
+
+def search_terms(query):
+    """Lowercase word tokens of ``query``; safe to splice into FTS syntax."""
+    return re.findall(r"\w+", (query or '').lower())
+
+
+class LikeSearchBackend:
+    """No index: OR of icontains over content and username, newest first."""
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def index_many(self, posts):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, query, limit, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        q_filter = Q()
+        for term in terms:
+            q_filter |= Q(content__icontains=term) | Q(user__username__icontains=term)
+        return list(
+            Post.objects.filter(q_filter, status='published')
+            .order_by('-created_at', '-id')
+            .values_list('id', flat=True)[offset:offset + limit]
+        )
+
+
+class PostgresSearchBackend:
+    VECTOR_SQL = (
+        "setweight(to_tsvector('english', u.username), 'A') || "
+        "setweight(to_tsvector('english', p.content), 'B')"
+    )
+
+    def index_post(self, post):
+        if post.status != 'published':
+            return self.remove_post(post.id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {POST_TABLE} p SET search_vector = {self.VECTOR_SQL} "
+                f"FROM {USER_TABLE} u WHERE u.id = p.user_id AND p.id = %s",
+                [post.id]
+            )
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {POST_TABLE} SET search_vector = NULL WHERE id = %s", [post_id])
+
+    def index_many(self, posts):
+        ids = [p.id for p in posts if p.status == 'published']
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {POST_TABLE} p SET search_vector = {self.VECTOR_SQL} "
+                f"FROM {USER_TABLE} u WHERE u.id = p.user_id AND p.id = ANY(%s)",
+                [ids]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {POST_TABLE} SET search_vector = NULL WHERE search_vector IS NOT NULL")
+
+    def search(self, query, limit, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        tsquery = ' | '.join(f"{term}:*" for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT p.id FROM {POST_TABLE} p, to_tsquery('english', %s) q "
+                "WHERE p.status = 'published' AND p.search_vector @@ q "
+                "ORDER BY ts_rank(p.search_vector, q) DESC, p.created_at DESC "
+                "LIMIT %s OFFSET %s",
+                [tsquery, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class SqliteSearchBackend:
+    def index_post(self, post):
+        self.remove_post(post.id)
+        if post.status == 'published':
+            self.index_many([post])
+
+    def remove_post(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+    def index_many(self, posts):
+        rows = [(p.id, p.content, p.user.username) for p in posts if p.status == 'published']
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, content, username) VALUES (%s, %s, %s)",
+                rows
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, query, limit, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT f.rowid FROM {FTS_TABLE} f JOIN {POST_TABLE} p ON p.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND p.status = 'published' "
+                f"ORDER BY bm25({FTS_TABLE}, 1.0, 2.0), p.created_at DESC "
+                "LIMIT %s OFFSET %s",
+                [match, limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+def _sqlite_fts_ready():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+_backend = None
+
+
+def get_search_backend():
+    """The search backend for the default database (chosen once per process)."""
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and _sqlite_fts_ready():
+            _backend = SqliteSearchBackend()
+        else:
+            _backend = LikeSearchBackend()
+    return _backend
+
+
+class _PrefixLRU:
+    """Tiny thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_typeahead_cache = _PrefixLRU(TYPEAHEAD_CACHE_SIZE, TYPEAHEAD_TTL)
+
+
+def normalize_prefix(prefix):
+    return (prefix or '').strip().lstrip('@').lower()
+
+
+def suggest_users(prefix, limit=TYPEAHEAD_LIMIT):
+    """Top ``limit`` users whose username starts with ``prefix``, best reputation first.
+
+    Returns a list of dicts (id, username, reputation_score, level).
+    """
+    prefix = normalize_prefix(prefix)
+    if not prefix:
+        return []
+    key = (prefix, limit)
+    results = _typeahead_cache.get(key)
+    if results is None:
+        results = list(
+            Profile.objects.filter(username_lower__startswith=prefix)
+            .order_by('-reputation_score', 'username_lower')
+            .values('user_id', 'user__username', 'reputation_score', 'level')[:limit]
+        )
+        results = [
+            {'id': row['user_id'], 'username': row['user__username'],
+             'reputation_score': row['reputation_score'], 'level': row['level']}
+            for row in results
+        ]
+        _typeahead_cache.set(key, results)
+    return results
+
+
+
+def suggest_users_for_terms(terms, limit=TYPEAHEAD_LIMIT):
+    """Users whose username starts with any of ``terms``, best reputation first."""
+    matches = {}
+    for term in terms:
+        for row in suggest_users(term, limit):
+            matches.setdefault(row['id'], row)
+    ranked = sorted(matches.values(), key=lambda row: (-row['reputation_score'], row['username'].lower()))
+    return ranked[:limit]
+
+def classify_query(q):
+    """Split a raw search box value into ``(match_type, normalized_term)``.
+
+    Terms are case-folded and whitespace-collapsed; keyword terms are also
+    de-duplicated and sorted, so "World  hello" and "hello world" share a
+    cache entry.
+    """
+    q = ' '.join((q or '').casefold().split())
+    if not q:
+        return 'empty', ''
+    if q in ('trending', '#trending'):
+        return 'trending', ''
+    if q.startswith('@'):
+        return 'user', normalize_prefix(q)
+    if q.startswith('#'):
+        return 'hashtag', q[1:].strip()
+    return 'keyword', ' '.join(sorted(set(q.split())))
+
+
+def search_post_ids(match_type, term, offset, limit):
+    """Ids of published posts for one page of results, best match first."""
+    posts = Post.objects.filter(status='published')
+    if match_type == 'trending':
+        # time-decayed popularity (same score as the sidebar)
+        posts = posts.order_by('-hot_score', '-created_at')
+    elif match_type == 'user':
+        posts = posts.filter(user__profile__username_lower__startswith=term).order_by('-created_at')
+    elif match_type == 'hashtag':
+        # exact, indexed lookup via the write-time hashtag index
+        posts = posts.filter(post_hashtags__hashtag__name=term).order_by('-created_at')
+    elif match_type == 'keyword':
+        return get_search_backend().search(term, limit, offset)
+    else:
+        return []
+    return list(posts.values_list('id', flat=True)[offset:offset + limit])
+
+
+def _tag_version(tag):
+    return cache.get(f'{TAG_VERSION_PREFIX}:{tag}', 0)
+
+
+def invalidate_hashtag_results(tags):
+    """Drop cached result pages for ``tags`` by bumping their versions."""
+    for tag in tags:
+        key = f'{TAG_VERSION_PREFIX}:{tag}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # evicted between add and incr
+            cache.set(key, 1, None)
+
+
+def cached_search_post_ids(match_type, term, page, page_size=SEARCH_PAGE_SIZE):
+    """``search_post_ids`` for ``page`` (plus one look-ahead id), cached briefly."""
+    if match_type in ('empty', 'none'):
+        return []
+    version = _tag_version(term) if match_type == 'hashtag' else 0
+    digest = hashlib.md5(term.encode()).hexdigest()
+    key = f'{SEARCH_CACHE_PREFIX}:{match_type}:{digest}:{version}:{page}:{page_size}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = search_post_ids(match_type, term, (page - 1) * page_size, page_size + 1)
+        cache.set(key, ids, SEARCH_CACHE_TTL)
+    return ids
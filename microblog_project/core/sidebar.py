@@ -0,0 +1,56 @@
+"""Trending sidebar shared by home, post_detail and search.
+
+The sidebar is cached for SIDEBAR_TTL seconds. When it goes stale, the
+first worker to take the refresh lock recomputes it while everyone else
+keeps serving the stale copy, so the cluster pays for roughly one
+computation per TTL instead of one per request.
+"""
+import time
+
+from django.core.cache import cache
+
+from .hashtags import trending_hashtags
+from .ranking import trending_posts
+
+SIDEBAR_CACHE_KEY = 'sidebar:trending'
+SIDEBAR_LOCK_KEY = 'sidebar:trending:lock'
+# seconds a computed sidebar counts as fresh
+SIDEBAR_TTL = 60
+# how long past freshness a stale copy may still be served
+SIDEBAR_STALE_TTL = 600
+# a crashed refresher releases the lock after this many seconds
+SIDEBAR_LOCK_TIMEOUT = 30
+
+
+def compute_sidebar():
+    return {
+        'trending_hashtags': trending_hashtags(),
+        'trending_posts': list(trending_posts()),
+    }
+
+
+def sidebar_context():
+    """Context for the trending sidebar: ``trending_hashtags`` and ``trending_posts``."""
+    entry = cache.get(SIDEBAR_CACHE_KEY)
+    now = time.time()
+    if entry is not None and entry['fresh_until'] > now:
+        return entry['value']
+
+    # single flight: only the lock holder recomputes
+    if cache.add(SIDEBAR_LOCK_KEY, 1, SIDEBAR_LOCK_TIMEOUT):
+        try:
+            value = compute_sidebar()
+            cache.set(
+                SIDEBAR_CACHE_KEY,
+                {'value': value, 'fresh_until': now + SIDEBAR_TTL},
+                SIDEBAR_TTL + SIDEBAR_STALE_TTL
+            )
+            return value
+        finally:
+            cache.delete(SIDEBAR_LOCK_KEY)
+
+    if entry is not None:
+        return entry['value']
+
+    # cold cache while another worker refreshes: compute without storing
+    return compute_sidebar()
@@ -1,6 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models import F, Subquery
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from .models import Like, Comment, Follow, Notification
+from .models import Post, Like, Comment, Bookmark, Follow, Message, Notification, PostHashtag, Profile
+from . import timeline
+from .ranking import refresh_hot_score
+from .hashtags import sync_post_hashtags, bump_buckets, bucket_start
+from .search import get_search_backend, invalidate_hashtag_results
+from .notifications import bump_unread, notify
+from .messaging import record_message
 
 # ======================
 # LIKE NOTIFICATION
@@ -10,16 +18,8 @@ def create_like_notification(sender, instance, created, **kwargs):
     if not created:
         return
 
-    post = instance.post
-    recipient = post.user
-
-    if instance.user != recipient:
-        Notification.objects.create(
-            recipient=recipient,
-            sender=instance.user,
-            notification_type='like',
-            post=post
-        )
+    recipient_id = Post.objects.filter(pk=instance.post_id).values_list('user_id', flat=True).first()
+    notify(recipient_id, instance.user_id, 'like', instance.post_id)
 
 
 # ======================
@@ -30,16 +30,8 @@ def create_comment_notification(sender, instance, created, **kwargs):
     if not created:
         return
 
-    post = instance.post
-    recipient = post.user
-
-    if instance.user != recipient:
-        Notification.objects.create(
-            recipient=recipient,
-            sender=instance.user,
-            notification_type='comment',
-            post=post
-        )
+    recipient_id = Post.objects.filter(pk=instance.post_id).values_list('user_id', flat=True).first()
+    notify(recipient_id, instance.user_id, 'comment', instance.post_id)
 
 
 # ======================
@@ -50,11 +42,149 @@ def create_follow_notification(sender, instance, created, **kwargs):
     if not created:
         return
 
-    if instance.follower == instance.following:
+    notify(instance.following_id, instance.follower_id, 'follow')
+
+
+# ======================
+# TIMELINE FAN-OUT
+# ======================
+@receiver(post_save, sender=Post)
+def update_timelines_on_post_save(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+
+    if instance.status == previous:
         return
 
-    Notification.objects.create(
-        sender=instance.follower,
-        recipient=instance.following,
-        notification_type='follow'
-    )
+    if instance.status == 'published':
+        timeline.fan_out_post(instance)
+    elif previous == 'published':
+        timeline.remove_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline_on_follow(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill_follow(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline_on_unfollow(sender, instance, **kwargs):
+    timeline.prune_follow(instance.follower_id, instance.following_id)
+
+
+# ======================
+# POST COUNTERS
+# ======================
+POST_COUNTER_FIELDS = {Like: 'like_count', Comment: 'comment_count', Bookmark: 'bookmark_count'}
+
+
+def _bump_post_counter(model, post_id, delta):
+    field = POST_COUNTER_FIELDS[model]
+    Post.objects.filter(pk=post_id).update(**{field: Greatest(F(field) + delta, 0)})
+    if model is not Bookmark:
+        refresh_hot_score(post_id)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Bookmark)
+def increment_post_counter(sender, instance, created, **kwargs):
+    if created:
+        _bump_post_counter(sender, instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Bookmark)
+def decrement_post_counter(sender, instance, **kwargs):
+    _bump_post_counter(sender, instance.post_id, -1)
+
+
+# ======================
+# PROFILE ENGAGEMENT COUNTERS
+# ======================
+PROFILE_COUNTER_FIELDS = {Like: 'likes_received_count', Comment: 'comments_received_count'}
+
+
+def _bump_profile_counter(field, delta, user_id=None, post_id=None):
+    """F()-update one Profile counter; the owner comes from ``user_id`` or ``post_id``."""
+    if user_id is None:
+        user_id = Subquery(Post.objects.filter(pk=post_id).values('user_id')[:1])
+    Profile.objects.filter(user_id=user_id).update(**{field: Greatest(F(field) + delta, 0)})
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_save, sender=Comment)
+def increment_received_counter(sender, instance, created, **kwargs):
+    if created:
+        _bump_profile_counter(PROFILE_COUNTER_FIELDS[sender], 1, post_id=instance.post_id)
+
+
+@receiver(post_delete, sender=Like)
+@receiver(post_delete, sender=Comment)
+def decrement_received_counter(sender, instance, **kwargs):
+    _bump_profile_counter(PROFILE_COUNTER_FIELDS[sender], -1, post_id=instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def increment_followers_counter(sender, instance, created, **kwargs):
+    if created:
+        _bump_profile_counter('followers_count', 1, user_id=instance.following_id)
+
+
+@receiver(post_delete, sender=Follow)
+def decrement_followers_counter(sender, instance, **kwargs):
+    _bump_profile_counter('followers_count', -1, user_id=instance.following_id)
+
+
+# ======================
+# HASHTAG INDEX
+# ======================
+@receiver(post_save, sender=Post)
+def index_hashtags_on_post_save(sender, instance, **kwargs):
+    changed = sync_post_hashtags(instance)
+    if changed:
+        invalidate_hashtag_results(changed)
+
+
+@receiver(post_delete, sender=PostHashtag)
+def release_hashtag_bucket(sender, instance, **kwargs):
+    bump_buckets({(instance.hashtag_id, bucket_start(instance.created_at)): 1}, delta=-1)
+
+
+# ======================
+# SEARCH INDEX
+# ======================
+@receiver(post_save, sender=Post)
+def index_post_for_search(sender, instance, **kwargs):
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance.id)
+
+
+# ======================
+# UNREAD NOTIFICATION COUNTER
+# ======================
+@receiver(post_save, sender=Notification)
+def count_new_notification(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        bump_unread(instance.recipient_id, 1)
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        bump_unread(instance.recipient_id, -1)
+
+
+# ======================
+# CONVERSATIONS
+# ======================
+@receiver(post_save, sender=Message)
+def update_conversation(sender, instance, created, **kwargs):
+    if created:
+        record_message(instance)
@@ -0,0 +1,167 @@
+"""Direct-message WebSocket, served next to Django by asgi.py.
+
+One socket per open tab at DM_SOCKET_PATH. The session cookie identifies the
+user. Frames are JSON objects with a ``type``:
+
+client -> server
+    ``send``  ``{to: user id, content, client_id}``: stores the message and
+              answers ``ack`` with the stored message (and ``client_id``);
+              the recipient and the sender's connections get it as a
+              ``message`` event (clients skip ids they already show).
+    ``read``  ``{message_ids}``: buffered and flushed every
+              READ_RECEIPT_FLUSH_SECONDS (and on close) as one ``is_read``
+              update; the senders get a ``read`` event.
+
+server -> client
+    ``ack``, ``message``, ``read`` and ``error``.
+
+Delivery between connections goes through the core.realtime fan-out, so the
+in-memory default works in one process and tests need no external service.
+"""
+import asyncio
+import json
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user, get_user_model
+from django.http.request import validate_host
+
+from .messaging import mark_messages_read, message_payload, send_message
+from .realtime import get_fanout
+
+DM_SOCKET_PATH = '/ws/messages/'
+READ_RECEIPT_FLUSH_SECONDS = 1.0
+# events from the fan-out that belong on this socket
+FORWARDED_EVENTS = {'message', 'read'}
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', ()):
+        if key.decode('latin1').lower() == name:
+            return value.decode('latin1')
+    return None
+
+
+def _origin_allowed(scope):
+    """Reject cross-site sockets: the Origin host must be an allowed host."""
+    origin = _header(scope, 'origin')
+    if origin is None:
+        return True  # not a browser
+    host = urlsplit(origin).hostname or ''
+    return validate_host(host, settings.ALLOWED_HOSTS)
+
+
+@sync_to_async
+def _authenticate(scope):
+    cookies = SimpleCookie(_header(scope, 'cookie') or '')
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    # get_user only needs request.session
+    user = get_user(SimpleNamespace(session=session))
+    return user if user.is_authenticated else None
+
+
+@sync_to_async
+def _send(sender_id, recipient_id, content):
+    if not get_user_model().objects.filter(pk=recipient_id).exists():
+        return None
+    return message_payload(send_message(sender_id, recipient_id, content))
+
+
+class DirectMessageSocket:
+    def __init__(self, scope, receive, send):
+        self.scope = scope
+        self.receive = receive
+        self.send = send
+        self.user = None
+        self.pending_reads = set()
+
+    async def send_json(self, data):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(data)})
+
+    async def run(self):
+        if (await self.receive())['type'] != 'websocket.connect':
+            return
+        if _origin_allowed(self.scope):
+            self.user = await _authenticate(self.scope)
+        if self.user is None:
+            await self.send({'type': 'websocket.close', 'code': 4401})
+            return
+        await self.send({'type': 'websocket.accept'})
+
+        async with get_fanout().subscribe(self.user.id) as queue:
+            tasks = [asyncio.create_task(self.forward(queue)), asyncio.create_task(self.flush_periodically())]
+            try:
+                while True:
+                    event = await self.receive()
+                    if event['type'] == 'websocket.disconnect':
+                        break
+                    if event['type'] == 'websocket.receive':
+                        await self.dispatch(event.get('text') or '')
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await self.flush_reads()
+
+    async def forward(self, queue):
+        while True:
+            event = await queue.get()
+            if event['type'] in FORWARDED_EVENTS:
+                await self.send_json(event)
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(READ_RECEIPT_FLUSH_SECONDS)
+            await self.flush_reads()
+
+    async def flush_reads(self):
+        if not self.pending_reads:
+            return
+        ids, self.pending_reads = list(self.pending_reads), set()
+        await sync_to_async(mark_messages_read)(self.user.id, ids)
+
+    async def dispatch(self, text):
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            frame = None
+        if not isinstance(frame, dict):
+            await self.send_json({'type': 'error', 'error': 'invalid frame'})
+            return
+
+        if frame.get('type') == 'send':
+            await self.handle_send(frame)
+        elif frame.get('type') == 'read':
+            ids = frame.get('message_ids')
+            if isinstance(ids, list):
+                self.pending_reads.update(i for i in ids if isinstance(i, int))
+        else:
+            await self.send_json({'type': 'error', 'error': 'unknown type'})
+
+    async def handle_send(self, frame):
+        client_id = frame.get('client_id')
+        content = str(frame.get('content') or '').strip()
+        recipient_id = frame.get('to')
+        if not content or not isinstance(recipient_id, int):
+            await self.send_json({'type': 'error', 'client_id': client_id, 'error': 'invalid message'})
+            return
+        message = await _send(self.user.id, recipient_id, content)
+        if message is None:
+            await self.send_json({'type': 'error', 'client_id': client_id, 'error': 'unknown recipient'})
+            return
+        await self.send_json({'type': 'ack', 'client_id': client_id, 'message': message})
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI entry point for ``websocket`` scopes."""
+    if scope['path'] != DM_SOCKET_PATH:
+        await receive()
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    await DirectMessageSocket(scope, receive, send).run()
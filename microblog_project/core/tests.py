@@ -1,7 +1,55 @@
-from django.test import TestCase
-from django.urls import reverse
+import asyncio
+import json
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Post, Like
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models.query import QuerySet
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import leaderboard, reputation, search, sidebar, timeline
+from .context_processors import current_profile, notifications, top_creators
+from .hashtags import bucket_start, prune_buckets, trending_hashtags
+from .loaders import attach_comment_trees, viewer_state
+from .messaging import conversation_page, mark_conversation_read, send_message
+from .models import (
+    Comment, CommentLike, Community, CommunityComment, CommunityPost, CommunityPostLike, Conversation, Follow,
+    HashtagBucket, Like, Message, Notification, NotificationArchive, PendingReputationRecalc, Post, PostHashtag,
+    Profile, TimelineEntry,
+)
+from .notifications import mark_all_read, notify, unread_count
+from .ranking import trending_posts
+from .realtime import InMemoryFanout
+from .reputation import process_pending, recalc_user
+from .search import (
+    SEARCH_PAGE_SIZE, LikeSearchBackend, SqliteSearchBackend, _typeahead_cache, classify_query, get_search_backend,
+    suggest_users,
+)
+from .sidebar import sidebar_context
+from .sockets import websocket_application
+from .timeline import timeline_post_ids
+from .utils import calculate_engagement_score
+from .viewer import get_viewer
+
+
+class CacheResetMixin:
+    """Start each test with an empty cache (counters, leaderboard, sidebar, search pages)."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
 
 
 class SearchTests(TestCase):
@@ -44,3 +92,1173 @@ class SearchTests(TestCase):
         self.assertGreater(len(posts), 0)
         self.assertEqual(posts[0], self.p1)
 
+
+
+class HomeFeedPaginationTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        now = timezone.now()
+        # 25 posts, newest last, so the feed page size (20) splits them
+        self.posts = [
+            Post.objects.create(user=self.alice, content=f'post {i}', created_at=now - timedelta(minutes=25 - i))
+            for i in range(25)
+        ]
+        self.client.login(username='alice', password='pass')
+
+    def test_first_page_has_cursor(self):
+        resp = self.client.get(reverse('home'))
+        posts = resp.context['posts']
+        self.assertEqual(len(posts), 20)
+        self.assertEqual(posts[0], self.posts[-1])
+        self.assertIsNotNone(resp.context['next_cursor'])
+
+    def test_load_more_continues_after_cursor(self):
+        first = self.client.get(reverse('home'))
+        cursor = first.context['next_cursor']
+
+        resp = self.client.get(reverse('home_feed_more') + f'?cursor={cursor}')
+        data = resp.json()
+        self.assertIsNone(data['next_cursor'])
+        for p in self.posts[:5]:
+            self.assertIn(f'post {self.posts.index(p)}<', data['html'])
+        self.assertNotIn('post 5<', data['html'])
+
+    def test_bad_cursor_falls_back_to_first_page(self):
+        resp = self.client.get(reverse('home') + '?cursor=not-a-cursor')
+        self.assertEqual(resp.context['posts'][0], self.posts[-1])
+
+
+class TimelineFanOutTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        Follow.objects.create(follower=self.alice, following=self.bob)
+
+    def feed_ids(self, user):
+        return timeline_post_ids(user)
+
+    def test_publish_fans_out_to_followers(self):
+        post = Post.objects.create(user=self.bob, content='hi')
+        self.assertEqual(self.feed_ids(self.alice), [post.id])
+        self.assertEqual(self.feed_ids(self.bob), [post.id])
+
+    def test_draft_is_not_fanned_out_until_published(self):
+        post = Post.objects.create(user=self.bob, content='wip', status='draft')
+        self.assertEqual(self.feed_ids(self.alice), [])
+
+        post = Post.objects.get(id=post.id)
+        post.status = 'published'
+        post.save()
+        self.assertEqual(self.feed_ids(self.alice), [post.id])
+
+        post.status = 'draft'
+        post.save()
+        self.assertEqual(self.feed_ids(self.alice), [])
+
+    def test_unfollow_prunes_and_follow_backfills(self):
+        post = Post.objects.create(user=self.bob, content='hi')
+        Follow.objects.filter(follower=self.alice, following=self.bob).delete()
+        self.assertEqual(self.feed_ids(self.alice), [])
+
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        self.assertEqual(self.feed_ids(self.alice), [post.id])
+
+    def test_exempt_authors_are_merged_on_read(self):
+        with mock.patch.object(timeline, 'FANOUT_FOLLOWER_LIMIT', 1):
+            post = Post.objects.create(user=self.bob, content='big audience')
+            self.assertFalse(TimelineEntry.objects.filter(user=self.alice).exists())
+            self.assertEqual(self.feed_ids(self.alice), [post.id])
+
+    def test_migration_fills_existing_timelines(self):
+        carl = User.objects.create_user(username='carl', password='pass')
+        post = Post.objects.create(user=self.bob, content='from before timelines')
+        draft = Post.objects.create(user=carl, content='wip', status='draft')
+        TimelineEntry.objects.all().delete()
+
+        import_module('core.migrations.0020_populate_timelines').populate_timelines(apps, None)
+
+        self.assertEqual(self.feed_ids(self.alice), [post.id])
+        self.assertEqual(self.feed_ids(self.bob), [post.id])
+        self.assertFalse(TimelineEntry.objects.filter(post=draft).exists())
+
+
+class PostCounterTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='count me')
+        self.client.login(username='bob', password='pass')
+
+    def counters(self):
+        self.post.refresh_from_db()
+        return self.post.like_count, self.post.comment_count, self.post.bookmark_count
+
+    def test_like_comment_bookmark_views_keep_counters(self):
+        self.client.get(reverse('like', args=[self.post.id]))
+        self.client.post(reverse('add_comment', args=[self.post.id]), {'comment': 'nice'})
+        resp = self.client.post(reverse('bookmark_toggle', args=[self.post.id]))
+        self.assertEqual(resp.json()['bookmark_count'], 1)
+        self.assertEqual(self.counters(), (1, 1, 1))
+
+        self.client.get(reverse('unlike', args=[self.post.id]))
+        self.client.post(reverse('bookmark_toggle', args=[self.post.id]))
+        comment = self.post.comments.get()
+        self.client.get(reverse('delete_comment', args=[comment.id]))
+        self.assertEqual(self.counters(), (0, 0, 0))
+
+    def test_recount_repairs_drift(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=3)
+
+        call_command('recount_post_counters', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_full_save_of_stale_post_keeps_counters(self):
+        stale = Post.objects.get(pk=self.post.pk)
+        Like.objects.create(user=self.bob, post=self.post)
+        Comment.objects.create(user=self.bob, post=self.post, text='first')
+
+        stale.content = 'edited'
+        stale.save()
+        self.assertEqual(self.counters(), (1, 1, 0))
+        self.assertEqual(self.post.content, 'edited')
+
+
+class CommentTreeLoaderTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.client.login(username='alice', password='pass')
+
+    def add_posts(self, n):
+        for i in range(n):
+            post = Post.objects.create(user=self.alice, content=f'post {i}')
+            top = Comment.objects.create(user=self.bob, post=post, text='top')
+            Comment.objects.create(user=self.alice, post=post, text='reply', parent=top)
+            CommentLike.objects.create(user=self.alice, comment=top)
+
+    def test_loader_builds_tree_in_one_query(self):
+        self.add_posts(3)
+        posts = list(Post.objects.all())
+        with self.assertNumQueries(1):
+            attach_comment_trees(posts)
+
+        for post in posts:
+            self.assertEqual(len(post.comment_tree), 1)
+            top = post.comment_tree[0]
+            self.assertEqual(top.like_total, 1)
+            self.assertEqual([r.text for r in top.reply_list], ['reply'])
+
+    def test_home_query_budget_does_not_grow_with_page(self):
+        self.add_posts(1)
+        self.client.get(reverse('home'))  # warm per-process caches
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('home'))
+
+        self.add_posts(10)
+        self.client.get(reverse('home'))  # re-read the invalidated unread counter
+        with CaptureQueriesContext(connection) as large:
+            resp = self.client.get(reverse('home'))
+
+        self.assertEqual(len(resp.context['posts']), 11)
+        self.assertEqual(len(large), len(small))
+
+    def add_community_posts(self, community, n):
+        for i in range(n):
+            post = CommunityPost.objects.create(community=community, user=self.bob, content=f'community {i}')
+            CommunityComment.objects.create(post=post, user=self.bob, text='first')
+            CommunityComment.objects.create(post=post, user=self.alice, text='second')
+            CommunityPostLike.objects.create(user=self.alice, post=post)
+
+    def test_community_query_budget_does_not_grow_with_page(self):
+        community = Community.objects.create(name='club', created_by=self.alice)
+        community.members.add(self.alice, self.bob)
+        session = self.client.session
+        session['include_communities'] = True
+        session.save()
+
+        budgets = []
+        for n in (1, 10):
+            self.add_community_posts(community, n)
+            for url in (reverse('home'), reverse('community_detail', args=[community.id])):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as ctx:
+                    resp = self.client.get(url)
+                budgets.append(len(ctx))
+
+        self.assertEqual(budgets[:2], budgets[2:])
+        post = resp.context['posts'][0]
+        self.assertEqual(post.like_total, 1)
+        self.assertEqual([c.text for c in post.comments.all()], ['first', 'second'])
+
+
+class ViewerStateTests(TestCase):
+    def test_only_page_ids_are_returned(self):
+        alice = User.objects.create_user(username='alice', password='pass')
+        on_page = Post.objects.create(user=alice, content='shown')
+        off_page = Post.objects.create(user=alice, content='elsewhere')
+        Like.objects.create(user=alice, post=on_page)
+        Like.objects.create(user=alice, post=off_page)
+
+        with self.assertNumQueries(2):
+            state = viewer_state(alice, [on_page])
+        self.assertEqual(state['liked_posts'], {on_page.id})
+        self.assertEqual(state['bookmarked_posts'], set())
+
+
+class HashtagIndexTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+
+    def tags(self, post):
+        return set(PostHashtag.objects.filter(post=post).values_list('hashtag__name', flat=True))
+
+    def test_index_follows_edits_and_status(self):
+        post = Post.objects.create(user=self.alice, content='#Django and #python')
+        self.assertEqual(self.tags(post), {'django', 'python'})
+
+        post.content = '#django only'
+        post.save()
+        self.assertEqual(self.tags(post), {'django'})
+
+        post.status = 'draft'
+        post.save()
+        self.assertEqual(self.tags(post), set())
+
+    def test_hashtag_search_is_exact(self):
+        match = Post.objects.create(user=self.alice, content='#greet')
+        Post.objects.create(user=self.alice, content='#greetings')
+
+        resp = self.client.get(reverse('search') + '?q=%23Greet')
+        self.assertEqual(list(resp.context['posts']), [match])
+
+    def test_backfill_indexes_existing_posts(self):
+        post = Post.objects.create(user=self.alice, content='#old #tags')
+        PostHashtag.objects.all().delete()
+
+        call_command('backfill_hashtags', '--chunk-size', '1', stdout=StringIO())
+        self.assertEqual(self.tags(post), {'old', 'tags'})
+
+
+class TrendingHashtagTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+
+    def test_trending_counts_recent_activity(self):
+        Post.objects.create(user=self.alice, content='#a #b')
+        Post.objects.create(user=self.alice, content='#b')
+        doomed = Post.objects.create(user=self.alice, content='#c #c')
+        self.assertEqual(trending_hashtags(), ['b', 'a', 'c'])
+
+        doomed.delete()
+        self.assertEqual(trending_hashtags(), ['b', 'a'])
+
+    def test_old_buckets_fall_out_and_are_pruned(self):
+        Post.objects.create(user=self.alice, content='#stale')
+        HashtagBucket.objects.update(bucket_start=bucket_start(timezone.now()) - timedelta(hours=72))
+
+        self.assertEqual(trending_hashtags(), [])
+        self.assertEqual(prune_buckets(), 1)
+
+
+class HotScoreTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+
+    def test_likes_update_score_and_old_posts_decay(self):
+        old = Post.objects.create(user=self.alice, content='old', created_at=timezone.now() - timedelta(days=2))
+        new = Post.objects.create(user=self.alice, content='new')
+        Like.objects.create(user=self.bob, post=old)
+        Like.objects.create(user=self.alice, post=old)
+        Like.objects.create(user=self.bob, post=new)
+
+        old.refresh_from_db()
+        self.assertGreater(old.hot_score, 0)
+        # one fresh like beats two likes on a two-day-old post
+        self.assertEqual(list(trending_posts())[:2], [new, old])
+
+        Post.objects.filter(pk=new.pk).update(created_at=timezone.now() - timedelta(days=30))
+        call_command('recompute_hot_scores', stdout=StringIO())
+        self.assertEqual(list(trending_posts())[:2], [old, new])
+
+    def test_editing_a_post_keeps_its_hot_score(self):
+        post = Post.objects.create(user=self.alice, content='hot')
+        stale = Post.objects.get(pk=post.pk)
+        Like.objects.create(user=self.bob, post=post)
+
+        stale.content = 'still hot'
+        stale.save()
+        post.refresh_from_db()
+        self.assertGreater(post.hot_score, 0)
+
+    def test_worker_mode_seeds_and_keeps_rescoring(self):
+        post = Post.objects.create(user=self.alice, content='from before scores')
+        Post.objects.filter(pk=post.pk).update(like_count=3, hot_score=0)
+
+        sleep = 'core.management.commands.recompute_hot_scores.time.sleep'
+        with mock.patch(sleep, side_effect=[None, KeyboardInterrupt]) as pause:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('recompute_hot_scores', '--all', every=600, stdout=StringIO())
+
+        pause.assert_called_with(600)
+        self.assertEqual(pause.call_count, 2)
+        post.refresh_from_db()
+        self.assertGreater(post.hot_score, 0)
+
+
+class SidebarCacheTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        alice = User.objects.create_user(username='alice', password='pass')
+        Post.objects.create(user=alice, content='#cached')
+
+    def test_fresh_entry_is_served_from_cache(self):
+        first = sidebar_context()
+        self.assertEqual(first['trending_hashtags'], ['cached'])
+        with self.assertNumQueries(0):
+            self.assertEqual(sidebar_context()['trending_hashtags'], ['cached'])
+
+    def test_stale_entry_served_while_another_worker_refreshes(self):
+        cache.set(sidebar.SIDEBAR_CACHE_KEY, {'value': {'trending_hashtags': ['stale']}, 'fresh_until': 0}, 60)
+        cache.add(sidebar.SIDEBAR_LOCK_KEY, 1, 60)
+        with self.assertNumQueries(0):
+            self.assertEqual(sidebar.sidebar_context()['trending_hashtags'], ['stale'])
+
+        cache.delete(sidebar.SIDEBAR_LOCK_KEY)
+        self.assertEqual(sidebar.sidebar_context()['trending_hashtags'], ['cached'])
+
+
+class FullTextSearchTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+
+    def _keyword_results(self, q, page=1):
+        # result pages are cached for a short TTL and tests repeat queries
+        # after editing posts; drop them so each call reads the index itself
+        cache.clear()
+        resp = self.client.get(reverse('search'), {'q': q, 'page': page})
+        return resp, resp.context['posts']
+
+    def test_index_follows_edit_draft_and_delete(self):
+        post = Post.objects.create(user=self.alice, content='Learning django today')
+        self.assertEqual(self._keyword_results('django')[1], [post])
+
+        post.content = 'Learning flask today'
+        post.save()
+        self.assertEqual(self._keyword_results('django')[1], [])
+        self.assertEqual(self._keyword_results('flask')[1], [post])
+
+        post.status = 'draft'
+        post.save()
+        self.assertEqual(self._keyword_results('flask')[1], [])
+
+        post.status = 'published'
+        post.save()
+        self.assertEqual(self._keyword_results('flask')[1], [post])
+
+        post.delete()
+        self.assertEqual(self._keyword_results('flask')[1], [])
+
+    def test_prefix_terms_and_author_names_match(self):
+        post = Post.objects.create(user=self.bob, content='Gardening notes')
+        self.assertIn(post, self._keyword_results('garden')[1])
+        self.assertIn(post, self._keyword_results('bob')[1])
+
+    def test_more_matching_terms_rank_first(self):
+        if isinstance(get_search_backend(), LikeSearchBackend):
+            self.skipTest('no full-text index on this database (icontains fallback)')
+        # the better match is older, so newest-first ordering would fail
+        strong = Post.objects.create(user=self.alice, content='coffee and croissants this morning')
+        weak = Post.objects.create(user=self.alice, content='coffee')
+        posts = self._keyword_results('coffee croissants')[1]
+        self.assertEqual(posts, [strong, weak])
+
+    def test_failed_reindex_keeps_the_old_index(self):
+        backend = get_search_backend()
+        if isinstance(backend, LikeSearchBackend):
+            self.skipTest('no full-text index on this database (icontains fallback)')
+        post = Post.objects.create(user=self.alice, content='durable index')
+
+        with mock.patch.object(type(backend), 'index_many', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                call_command('reindex_posts', stdout=StringIO())
+
+        self.assertEqual(self._keyword_results('durable')[1], [post])
+
+    def test_sqlite_fts_backend_ranks_by_bm25(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite only')
+        search_index = import_module('core.migrations.0008_post_search_index')
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(search_index.SQLITE_FORWARD[0])
+            except OperationalError:
+                self.skipTest('SQLite built without FTS5')
+        backend = SqliteSearchBackend()
+        strong = Post.objects.create(user=self.alice, content='coffee and croissants this morning')
+        weak = Post.objects.create(user=self.alice, content='coffee')
+        by_bob = Post.objects.create(user=self.bob, content='tea')
+        backend.index_many(Post.objects.select_related('user'))
+
+        self.assertEqual(backend.search('coffee croissants', 10), [strong.id, weak.id])
+        self.assertEqual(backend.search('croiss', 10), [strong.id])
+        self.assertEqual(backend.search('bob', 10), [by_bob.id])
+
+        backend.remove_post(strong.id)
+        self.assertEqual(backend.search('coffee', 10), [weak.id])
+
+    def test_results_are_paginated(self):
+        for i in range(SEARCH_PAGE_SIZE + 3):
+            Post.objects.create(user=self.alice, content=f'pagination test {i}')
+
+        resp, first = self._keyword_results('pagination')
+        self.assertEqual(len(first), SEARCH_PAGE_SIZE)
+        self.assertEqual(resp.context['next_page'], 2)
+
+        resp, second = self._keyword_results('pagination', page=2)
+        self.assertEqual(len(second), 3)
+        self.assertIsNone(resp.context['next_page'])
+        self.assertFalse({p.id for p in first} & {p.id for p in second})
+
+
+class UserTypeaheadTests(TestCase):
+    def setUp(self):
+        _typeahead_cache.clear()
+        self.alice = User.objects.create_user(username='Alice', password='pass')
+        self.alan = User.objects.create_user(username='alan', password='pass')
+        User.objects.create_user(username='malory', password='pass')
+        self.alan.profile.reputation_score = 0.9
+        self.alan.profile.save()
+
+    def test_prefix_match_is_case_insensitive_and_ranked_by_reputation(self):
+        resp = self.client.get(reverse('user_typeahead'), {'q': 'AL'})
+        names = [row['username'] for row in resp.json()['results']]
+        self.assertEqual(names, ['alan', 'Alice'])
+
+    def test_hot_prefix_served_from_process_cache(self):
+        suggest_users('al')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(suggest_users('al')), 2)
+
+    def test_keyword_search_matches_users_per_term(self):
+        resp = self.client.get(reverse('search'), {'q': 'coffee with mal al'})
+        names = [row['username'] for row in resp.context['users']]
+        self.assertEqual(names, ['alan', 'Alice', 'malory'])
+
+    def test_rename_updates_normalized_username(self):
+        self.alice.username = 'Zed'
+        self.alice.save()
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.username_lower, 'zed')
+
+
+class SearchResultCacheTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.first = Post.objects.create(user=self.alice, content='#coffee first cup')
+
+    def test_query_normalization(self):
+        self.assertEqual(classify_query('  World   HELLO hello '), ('keyword', 'hello world'))
+        self.assertEqual(classify_query('#Trending'), ('trending', ''))
+        self.assertEqual(classify_query('@Bob'), ('user', 'bob'))
+        self.assertEqual(classify_query('#Coffee'), ('hashtag', 'coffee'))
+
+    def test_result_ids_are_cached(self):
+        with mock.patch.object(search, 'search_post_ids', wraps=search.search_post_ids) as compute:
+            self.client.get(reverse('search'), {'q': 'Cup first'})
+            self.client.get(reverse('search'), {'q': 'first  cup'})
+        self.assertEqual(compute.call_count, 1)
+
+    def test_publishing_a_tagged_post_invalidates_that_hashtag(self):
+        resp = self.client.get(reverse('search'), {'q': '#coffee'})
+        self.assertEqual(resp.context['posts'], [self.first])
+
+        second = Post.objects.create(user=self.alice, content='#coffee second cup')
+        resp = self.client.get(reverse('search'), {'q': '#coffee'})
+        self.assertEqual(resp.context['posts'], [second, self.first])
+
+
+class DeferredReputationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='A fairly long post about something worth reading')
+
+    def test_events_only_mark_users_dirty(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        Comment.objects.create(user=self.bob, post=self.post, text='nice')
+        self.assertEqual(
+            set(PendingReputationRecalc.objects.values_list('user_id', flat=True)),
+            {self.alice.id, self.bob.id}
+        )
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.reputation_score, 0.0)
+        self.assertEqual(self.alice.profile.action_points, 2)
+
+    def test_worker_coalesces_burst_into_one_recalc(self):
+        carl = User.objects.create_user(username='carl', password='pass')
+        Like.objects.create(user=self.bob, post=self.post)
+        Like.objects.create(user=carl, post=self.post)
+
+        with mock.patch.object(reputation, 'recalc_user', wraps=reputation.recalc_user) as recalc:
+            call_command('run_reputation_worker', '--once', '--window', '0', stdout=StringIO())
+        recalced = [call.args[0] for call in recalc.call_args_list]
+        self.assertEqual(recalced.count(self.alice.id), 1)
+        self.assertFalse(PendingReputationRecalc.objects.exists())
+
+        self.alice.profile.refresh_from_db()
+        self.assertGreater(self.alice.profile.reputation_score, 0.0)
+        self.assertGreater(self.alice.profile.ai_score, 0.0)
+
+    def test_failing_recalc_is_retried_later_then_dropped(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        with mock.patch.object(reputation, 'recalc_user', side_effect=RuntimeError('boom')):
+            reputation.process_pending(coalesce_seconds=0)
+            row = PendingReputationRecalc.objects.get(user=self.alice)
+            self.assertEqual(row.attempts, 1)
+            # pushed past the window: not picked up again right away
+            self.assertEqual(reputation.process_pending(coalesce_seconds=3600), 0)
+
+            for _ in range(reputation.RECALC_MAX_ATTEMPTS):
+                reputation.process_pending(coalesce_seconds=0)
+        self.assertFalse(PendingReputationRecalc.objects.exists())
+
+    def test_recent_marks_wait_for_the_window(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        self.assertEqual(process_pending(coalesce_seconds=3600), 0)
+
+    def test_inline_mode_recalculates_immediately(self):
+        with override_settings(REPUTATION_RECALC_INLINE=True):
+            Like.objects.create(user=self.bob, post=self.post)
+        self.assertFalse(PendingReputationRecalc.objects.filter(user=self.bob).exists())
+        self.alice.profile.refresh_from_db()
+        self.assertGreater(self.alice.profile.reputation_score, 0.0)
+
+
+class ProfileCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='counted')
+
+    def _counts(self, user):
+        return Profile.objects.values_list(
+            'followers_count', 'likes_received_count', 'comments_received_count'
+        ).get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        follow = Follow.objects.create(follower=self.bob, following=self.alice)
+        like = Like.objects.create(user=self.bob, post=self.post)
+        Comment.objects.create(user=self.bob, post=self.post, text='hi')
+        self.assertEqual(self._counts(self.alice), (1, 1, 1))
+
+        follow.delete()
+        like.delete()
+        self.post.delete()
+        self.assertEqual(self._counts(self.alice), (0, 0, 0))
+
+    def test_stale_profile_save_keeps_counters(self):
+        profile = self.alice.profile
+        Like.objects.create(user=self.bob, post=self.post)
+        profile.bio = 'hello'
+        profile.save()
+        self.assertEqual(self._counts(self.alice), (0, 1, 0))
+
+    def test_engagement_score_reads_only_the_profile(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        with self.assertNumQueries(1):
+            self.assertGreater(calculate_engagement_score(self.alice), 0.0)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(user=self.bob, post=self.post)
+        Profile.objects.filter(user=self.alice).update(likes_received_count=9, followers_count=4)
+
+        call_command('reconcile_profile_counters', '--dry-run', stdout=StringIO())
+        self.assertEqual(self._counts(self.alice), (4, 9, 0))
+
+        call_command('reconcile_profile_counters', stdout=StringIO())
+        self.assertEqual(self._counts(self.alice), (0, 1, 0))
+
+
+class BulkReputationRecomputeTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        post = Post.objects.create(user=self.alice, content='A fairly long post about something worth reading')
+        Follow.objects.create(follower=self.bob, following=self.alice)
+        Like.objects.create(user=self.bob, post=post)
+        Comment.objects.create(user=self.bob, post=post, text='hi')
+
+    def test_matches_per_profile_recalc(self):
+        call_command('recompute_reputations', stdout=StringIO())
+        bulk = {
+            p.user_id: (round(p.reputation_score, 9), p.score, p.level, p.badge)
+            for p in Profile.objects.all()
+        }
+
+        for user in (self.alice, self.bob):
+            recalc_user(user.id)
+        single = {
+            p.user_id: (round(p.reputation_score, 9), p.score, p.level, p.badge)
+            for p in Profile.objects.all()
+        }
+        self.assertEqual(bulk, single)
+        self.assertGreater(bulk[self.alice.id][0], 0.0)
+
+    def test_dry_run_reports_without_writing(self):
+        out = StringIO()
+        call_command('recompute_reputations', '--dry-run', stdout=out)
+        self.assertIn(f"user {self.alice.id}: reputation 0.0000 ->", out.getvalue())
+        self.assertEqual(Profile.objects.get(user=self.alice).reputation_score, 0.0)
+
+
+class LeaderboardTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [User.objects.create_user(username=f'user{i}', password='pass') for i in range(4)]
+        for i, user in enumerate(self.users):
+            Profile.objects.filter(user=user).update(reputation_score=i / 10)
+
+    def test_top_creators_served_from_cache(self):
+        self.assertEqual([p.user for p in leaderboard.top_creators(2)], [self.users[3], self.users[2]])
+        with self.assertNumQueries(0):
+            self.assertEqual(len(leaderboard.top_creators(2)), 2)
+
+    def test_change_below_cutoff_keeps_cache(self):
+        with mock.patch.object(leaderboard, 'LEADERBOARD_SIZE', 2):
+            leaderboard.leaderboard()
+            leaderboard.note_reputation_change(self.users[0].id, 0.0, 0.1)
+            with self.assertNumQueries(0):
+                leaderboard.leaderboard()
+
+            leaderboard.note_reputation_change(self.users[0].id, 0.0, 0.9)
+            with self.assertNumQueries(1):
+                leaderboard.leaderboard()
+
+    def test_rank_of_beyond_cached_board(self):
+        with mock.patch.object(leaderboard, 'LEADERBOARD_SIZE', 2):
+            self.assertEqual(leaderboard.rank_of(self.users[0].profile), 4)
+            self.assertEqual(leaderboard.rank_of(self.users[3].profile), 1)
+
+    def test_leaderboard_page(self):
+        self.client.login(username='user1', password='pass')
+        resp = self.client.get(reverse('leaderboard'))
+        ranked = [(rank, p.user) for rank, p in resp.context['ranked_profiles']]
+        self.assertEqual(ranked, [(4 - i, u) for i, u in enumerate(self.users)][::-1])
+        self.assertEqual(resp.context['my_rank'], 3)
+        self.assertIsNone(resp.context['next_page'])
+
+
+class RequestViewerCacheTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        Follow.objects.create(follower=self.alice, following=self.bob)
+        Post.objects.create(user=self.bob, content='hello #there')
+        self.client.login(username='alice', password='pass')
+
+    def test_home_total_query_count(self):
+        self.client.get(reverse('home'))  # warm sidebar / leaderboard caches
+        # session, user, timeline ids, posts, comment trees, liked + bookmarked
+        # ids, profile, following ids: once each (unread count is cached)
+        with self.assertNumQueries(9):
+            self.client.get(reverse('home'))
+
+    def test_viewer_state_is_loaded_once_per_request(self):
+        request = RequestFactory().get('/')
+        request.user = self.alice
+        viewer = get_viewer(request)
+        self.assertEqual(viewer.following_ids, {self.bob.id})
+        viewer.profile, viewer.unread_notifications_count
+        top_creators(request)  # cached leaderboard warmed here
+
+        with self.assertNumQueries(0):
+            current_profile(request)
+            notifications(request)
+            self.assertEqual(top_creators(request)['following_ids'], {self.bob.id})
+
+
+def _eager(processor):
+    """``processor`` with every value read up front (the pre-lazy behavior)."""
+    def wrapped(request):
+        values = processor(request)
+        for value in values.values():
+            bool(value)
+        return values
+    return wrapped
+
+
+def eager_current_profile(request):
+    return _eager(current_profile)(request)
+
+
+def eager_notifications(request):
+    return _eager(notifications)(request)
+
+
+def eager_top_creators(request):
+    return _eager(top_creators)(request)
+
+
+EAGER_CONTEXT_PROCESSORS = {
+    'core.context_processors.current_profile': 'core.tests.eager_current_profile',
+    'core.context_processors.notifications': 'core.tests.eager_notifications',
+    'core.context_processors.top_creators': 'core.tests.eager_top_creators',
+}
+
+
+class LazyContextProcessorTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        Follow.objects.create(follower=self.bob, following=self.alice)
+        self.client.login(username='alice', password='pass')
+
+    def _feed_fragment_queries(self):
+        cache.clear()  # cold counter and leaderboard, so reading them costs a query
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('home_feed_more'))
+        self.assertIn('shown in the feed', resp.json()['html'])
+        return [q['sql'] for q in ctx.captured_queries]
+
+    def test_fragment_skips_unused_context_queries(self):
+        """Benchmark: the same endpoint with the eager and the lazy processors."""
+
+        Post.objects.create(user=self.alice, content='shown in the feed')
+
+        templates = [{**settings.TEMPLATES[0], 'OPTIONS': {
+            **settings.TEMPLATES[0]['OPTIONS'],
+            'context_processors': [
+                EAGER_CONTEXT_PROCESSORS.get(path, path)
+                for path in settings.TEMPLATES[0]['OPTIONS']['context_processors']
+            ],
+        }}]
+        with override_settings(TEMPLATES=templates):
+            eager = self._feed_fragment_queries()
+        lazy = self._feed_fragment_queries()
+
+        self.assertLess(len(lazy), len(eager))
+
+        def unread_counter(sql):
+            return [q for q in sql if '"unread_notifications_count"' in q and 'core_post' not in q]
+
+        def sidebar(sql):
+            # leaderboard read and the viewer's following ids
+            return [q for q in sql if '"reputation_score" DESC' in q or 'WHERE "core_follow"."follower_id"' in q]
+
+        # the fragment shows neither the navbar badge nor the sidebar
+        self.assertTrue(unread_counter(eager) and sidebar(eager))
+        self.assertEqual(unread_counter(lazy) + sidebar(lazy), [])
+
+    def test_lazy_values_render_in_templates(self):
+        resp = self.client.get(reverse('home'))
+        self.assertContains(resp, 'class="notification-count">1<')
+
+
+class UnreadCounterTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='notify me')
+        self.client.login(username='alice', password='pass')
+
+    def _notify(self):
+        return Notification.objects.create(
+            sender=self.bob, recipient=self.alice, notification_type='like', post=self.post
+        )
+
+    def test_counter_follows_create_read_and_delete(self):
+        first = self._notify()
+        second = self._notify()
+        self.assertEqual(unread_count(self.alice.id), 2)
+        with self.assertNumQueries(0):
+            unread_count(self.alice.id)
+
+        self.client.get(reverse('notification_redirect', args=[first.id]))
+        self.assertEqual(unread_count(self.alice.id), 1)
+        # opening it again does not count twice
+        self.client.get(reverse('notification_redirect', args=[first.id]))
+        self.assertEqual(unread_count(self.alice.id), 1)
+
+        second.delete()
+        self.assertEqual(unread_count(self.alice.id), 0)
+
+    def test_mark_all_read_resets_counter(self):
+        self._notify()
+        self._notify()
+        self.client.post(reverse('mark_notifications_read'))
+        self.assertEqual(unread_count(self.alice.id), 0)
+        self.alice.profile.refresh_from_db()
+        self.assertEqual(self.alice.profile.unread_notifications_count, 0)
+
+
+class NotificationGroupingTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='popular')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass') for i in range(3)]
+
+    def test_likes_on_a_post_share_one_row(self):
+        for fan in self.fans:
+            Like.objects.create(user=fan, post=self.post)
+
+        group = Notification.objects.get(recipient=self.alice)
+        self.assertEqual(group.actor_count, 3)
+        self.assertEqual(group.sender, self.fans[-1])
+        self.assertEqual(unread_count(self.alice.id), 1)
+
+    def test_like_and_follow_views_create_a_single_notification(self):
+        self.client.login(username='fan0', password='pass')
+        self.client.get(reverse('like', args=[self.post.id]))
+        self.client.post(reverse('follow', args=[self.alice.id]))
+        self.assertEqual(
+            sorted(Notification.objects.values_list('notification_type', 'actor_count')),
+            [('follow', 1), ('like', 1)]
+        )
+
+    def test_repeat_by_same_sender_is_idempotent(self):
+        notify(self.alice.id, self.fans[0].id, 'like', self.post.id)
+        notify(self.alice.id, self.fans[0].id, 'like', self.post.id)
+        self.assertEqual(Notification.objects.get().actor_count, 1)
+
+    def test_alternating_commenters_are_counted_once(self):
+        bob, carl = self.fans[:2]
+        for user in (bob, carl, bob, carl):
+            Comment.objects.create(user=user, post=self.post, text='again')
+
+        group = Notification.objects.get(recipient=self.alice)
+        self.assertEqual(group.actor_count, 2)
+        self.assertEqual(group.sender, carl)
+
+    def test_unlike_then_like_again_is_not_a_new_actor(self):
+        bob, carl = self.fans[:2]
+        Like.objects.create(user=bob, post=self.post)
+        Like.objects.create(user=carl, post=self.post)
+        Like.objects.filter(user=bob, post=self.post).delete()
+        Like.objects.create(user=bob, post=self.post)
+
+        group = Notification.objects.get(recipient=self.alice)
+        self.assertEqual(group.actor_count, 2)
+        self.assertEqual(group.sender, bob)
+
+    def test_read_group_reopens_on_new_activity(self):
+        Like.objects.create(user=self.fans[0], post=self.post)
+        mark_all_read(self.alice.id)
+        Like.objects.create(user=self.fans[1], post=self.post)
+        self.assertEqual(unread_count(self.alice.id), 1)
+
+    def test_dropdown_renders_group_without_per_row_queries(self):
+        for fan in self.fans:
+            Like.objects.create(user=fan, post=self.post)
+            Follow.objects.create(follower=fan, following=self.alice)
+        self.client.login(username='alice', password='pass')
+
+        with self.assertNumQueries(4):
+            resp = self.client.get(reverse('notification_dropdown'))
+        self.assertIn('and 2 others', resp.json()['html'])
+
+
+class NotificationPushTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.post = Post.objects.create(user=self.alice, content='hello')
+
+    def test_in_memory_fanout_delivers_to_subscribers_of_the_user(self):
+        fanout = InMemoryFanout()
+
+        async def run():
+            async with fanout.subscribe(self.alice.id) as queue:
+                self.assertEqual(fanout.connection_count(self.alice.id), 1)
+                fanout.publish(self.bob.id, {'type': 'notification', 'id': 1})
+                fanout.publish(self.alice.id, {'type': 'notification', 'id': 2})
+                event = await asyncio.wait_for(queue.get(), 1)
+                self.assertTrue(queue.empty())
+            return event
+
+        self.assertEqual(asyncio.run(run())['id'], 2)
+        self.assertEqual(fanout.connection_count(self.alice.id), 0)
+
+    def test_notification_is_pushed_after_commit(self):
+        published = []
+        fanout = mock.Mock(publish=lambda user_id, event: published.append((user_id, event)))
+        with mock.patch('core.notifications.get_fanout', return_value=fanout):
+            with self.captureOnCommitCallbacks(execute=True):
+                Like.objects.create(user=self.bob, post=self.post)
+                self.assertEqual(published, [])
+
+        self.assertEqual(len(published), 1)
+        user_id, event = published[0]
+        self.assertEqual(user_id, self.alice.id)
+        self.assertEqual((event['type'], event['unread']), ('notification', 1))
+
+    def test_stream_requires_login(self):
+        resp = self.client.get(reverse('notification_stream'))
+        self.assertEqual(resp.status_code, 401)
+
+    def test_stream_is_event_stream(self):
+        self.client.login(username='alice', password='pass')
+        resp = self.client.get(reverse('notification_stream'))
+        self.assertEqual(resp['Content-Type'], 'text/event-stream')
+        self.assertTrue(resp.streaming)
+
+
+class NotificationRetentionTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pass') for i in range(4)]
+
+    def _age(self, days, **filters):
+        Notification.objects.filter(**filters).update(created_at=timezone.now() - timedelta(days=days))
+
+    def _seed(self):
+        post = Post.objects.create(user=self.alice, content='hello')
+        for i, fan in enumerate(self.fans):
+            Notification.objects.create(sender=fan, recipient=self.alice, notification_type='like',
+                                        post=post, is_read=i < 3)
+        self._age(200)
+        # one read notification inside the window
+        Notification.objects.filter(sender=self.fans[2]).update(created_at=post.created_at)
+
+    def test_prune_deletes_only_old_read_notifications(self):
+        self._seed()
+        call_command('prune_notifications', chunk_size=2, sleep=0, stdout=StringIO())
+        self.assertEqual(
+            sorted(Notification.objects.values_list('sender__username', flat=True)),
+            ['fan2', 'fan3']
+        )
+
+    def test_prune_skips_id_gaps_without_sleeping(self):
+        self._seed()
+        far = Notification.objects.order_by('-id').first().id + 100000
+        Notification.objects.create(id=far, sender=self.fans[0], recipient=self.alice,
+                                    notification_type='follow', is_read=True)
+        self._age(200, id=far)
+
+        with mock.patch('core.management.commands.prune_notifications.time.sleep') as sleep:
+            call_command('prune_notifications', chunk_size=2, sleep=5, stdout=StringIO())
+        # one full chunk (the two old likes), then the far row ends the run
+        self.assertEqual(sleep.call_count, 1)
+        self.assertFalse(Notification.objects.filter(id=far).exists())
+
+    def test_prune_can_archive(self):
+        self._seed()
+        old_ids = set(Notification.objects.filter(sender__in=self.fans[:2]).values_list('id', flat=True))
+        call_command('prune_notifications', archive=True, sleep=0, stdout=StringIO())
+        self.assertEqual(set(NotificationArchive.objects.values_list('id', flat=True)), old_ids)
+        self.assertFalse(Notification.objects.filter(id__in=old_ids).exists())
+
+    def test_notifications_page_is_paginated(self):
+        self._seed()
+        self.client.login(username='alice', password='pass')
+        with mock.patch('core.views.NOTIFICATIONS_PAGE_SIZE', 3):
+            first = self.client.get(reverse('notifications'))
+            second = self.client.get(reverse('notifications'), {'page': 2})
+        self.assertEqual(len(first.context['notifications']), 3)
+        self.assertEqual(first.context['next_page'], 2)
+        self.assertEqual(len(second.context['notifications']), Notification.objects.count() - 3)
+        self.assertIsNone(second.context['next_page'])
+
+
+class ConversationInboxTests(CacheResetMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.friends = [User.objects.create_user(username=f'friend{i}', password='pass') for i in range(3)]
+
+    def test_messages_keep_conversation_in_step(self):
+        bob = self.friends[0]
+        send_message(bob.id, self.alice.id, 'hi')
+        last = send_message(bob.id, self.alice.id, 'are you there?')
+        send_message(self.alice.id, bob.id, 'yes')
+
+        conversation = Conversation.objects.get()
+        self.assertEqual(conversation.unread_for(self.alice.id), 2)
+        self.assertEqual(conversation.unread_for(bob.id), 1)
+
+        self.assertEqual(mark_conversation_read(self.alice.id, bob.id), 2)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.unread_for(self.alice.id), 0)
+        self.assertEqual(conversation.unread_for(bob.id), 1)
+        self.assertGreater(conversation.last_message_id, last.id)
+
+    def test_inbox_is_one_query_per_page(self):
+        for i, friend in enumerate(self.friends):
+            send_message(friend.id, self.alice.id, f'hello {i}')
+        send_message(self.alice.id, self.friends[0].id, 'latest')
+        self.client.login(username='alice', password='pass')
+        self.client.get(reverse('messages'))
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('messages'))
+        self.assertEqual(sum('core_conversation' in q['sql'] for q in ctx.captured_queries), 1)
+        self.assertFalse(any('core_message' in q['sql'] and 'core_conversation' not in q['sql']
+                             for q in ctx.captured_queries))
+        conversations = resp.context['conversations']
+        self.assertEqual([c['user'] for c in conversations], [self.friends[0], self.friends[2], self.friends[1]])
+        self.assertEqual([c['unread_count'] for c in conversations], [1, 1, 1])
+
+    def test_opening_conversation_clears_unread(self):
+        send_message(self.friends[0].id, self.alice.id, 'ping')
+        self.client.login(username='alice', password='pass')
+        self.client.get(reverse('conversation', args=['friend0']))
+        resp = self.client.get(reverse('messages'))
+        self.assertEqual(resp.context['conversations'][0]['unread_count'], 0)
+
+
+class ConversationPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+        self.sent = [
+            send_message(*((self.alice.id, self.bob.id) if i % 2 else (self.bob.id, self.alice.id)), f'm{i}')
+            for i in range(7)
+        ]
+        self.client.login(username='alice', password='pass')
+
+    def test_keyset_pages_walk_back_to_the_start(self):
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = conversation_page(self.alice.id, self.bob.id, cursor, limit=3)
+            seen = [m.content for m in page] + seen
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f'm{i}' for i in range(7)])
+
+    def test_view_renders_page_before_cursor(self):
+        _, cursor = conversation_page(self.alice.id, self.bob.id, limit=3)
+        resp = self.client.get(reverse('conversation', args=['bob']), {'before': cursor})
+        self.assertEqual([m.content for m in resp.context['messages']], ['m0', 'm1', 'm2', 'm3'])
+        self.assertIsNone(resp.context['older_cursor'])
+        self.assertContains(resp, 'Jump to latest')
+
+    def test_since_endpoint_returns_only_newer_messages(self):
+        resp = self.client.get(reverse('conversation_messages', args=['bob']), {'since': self.sent[4].id})
+        self.assertEqual([m['content'] for m in resp.json()['messages']], ['m5', 'm6'])
+
+    def test_ajax_send_returns_the_message(self):
+        resp = self.client.post(
+            reverse('conversation', args=['bob']), {'content': 'hey'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(resp.json()['message']['content'], 'hey')
+
+
+class DirectMessageSocketTests(TransactionTestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='pass')
+        self.bob = User.objects.create_user(username='bob', password='pass')
+
+    async def _connect(self, username):
+        client = Client()
+        await sync_to_async(client.login)(username=username, password='pass')
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        return ApplicationCommunicator(websocket_application, {
+            'type': 'websocket',
+            'path': '/ws/messages/',
+            'headers': [(b'cookie', cookie.encode()), (b'origin', b'http://testserver')],
+        })
+
+    async def _open(self, username):
+        socket = await self._connect(username)
+        await socket.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await socket.receive_output(1))['type'], 'websocket.accept')
+        return socket
+
+    async def _frame(self, socket):
+        return json.loads((await socket.receive_output(2))['text'])
+
+    async def test_send_acks_sender_and_pushes_to_recipient(self):
+        alice = await self._open('alice')
+        bob = await self._open('bob')
+
+        await alice.send_input({'type': 'websocket.receive', 'text': json.dumps(
+            {'type': 'send', 'to': self.bob.id, 'content': 'hi bob', 'client_id': 7}
+        )})
+        frames = {frame['type']: frame for frame in [await self._frame(alice), await self._frame(alice)]}
+        ack = frames['ack']
+        pushed = await self._frame(bob)
+
+        self.assertEqual(ack['client_id'], 7)
+        self.assertEqual(pushed['type'], 'message')
+        self.assertEqual(pushed['message'], ack['message'])
+        # alice's other tabs (here: this socket) see her own message too
+        self.assertEqual(frames['message']['message'], ack['message'])
+        self.assertTrue(await Message.objects.filter(pk=ack['message']['id'], content='hi bob').aexists())
+
+        for socket in (alice, bob):
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(1)
+
+    async def test_read_receipts_are_flushed_as_one_update(self):
+        sent = [await sync_to_async(send_message)(self.alice.id, self.bob.id, f'm{i}') for i in range(3)]
+        alice = await self._open('alice')
+        bob = await self._open('bob')
+        for message in sent:
+            await bob.send_input({'type': 'websocket.receive', 'text': json.dumps(
+                {'type': 'read', 'message_ids': [message.id]}
+            )})
+
+        updates = []
+        real_update = QuerySet.update
+
+        def spy(queryset, **kwargs):
+            if queryset.model is Message:
+                updates.append(kwargs)
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', spy):
+            await bob.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await bob.wait(2)
+        receipt = await self._frame(alice)
+
+        self.assertEqual(sorted(receipt['message_ids']), [m.id for m in sent])
+        self.assertEqual(updates, [{'is_read': True}])
+        self.assertFalse(await Message.objects.filter(is_read=False).aexists())
+        conversation = await Conversation.objects.aget()
+        self.assertEqual(conversation.unread_for(self.bob.id), 0)
+
+        await alice.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await alice.wait(1)
+
+    async def test_reading_over_http_sends_a_receipt(self):
+        message = await sync_to_async(send_message)(self.alice.id, self.bob.id, 'ping')
+        alice = await self._open('alice')
+
+        client = Client()
+        await sync_to_async(client.login)(username='bob', password='pass')
+        await sync_to_async(client.get)(reverse('conversation', args=['alice']))
+
+        receipt = await self._frame(alice)
+        self.assertEqual(receipt, {'type': 'read', 'reader_id': self.bob.id, 'message_ids': [message.id]})
+
+        await alice.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await alice.wait(1)
+
+    async def test_rejects_anonymous_and_cross_site(self):
+        anonymous = ApplicationCommunicator(websocket_application, {
+            'type': 'websocket', 'path': '/ws/messages/', 'headers': [],
+        })
+        await anonymous.send_input({'type': 'websocket.connect'})
+        self.assertEqual((await anonymous.receive_output(1))['code'], 4401)
+
+        socket = await self._connect('alice')
+        socket.scope['headers'][1] = (b'origin', b'https://evil.example')
+        with self.settings(ALLOWED_HOSTS=['testserver']):
+            await socket.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await socket.receive_output(1))['code'], 4401)
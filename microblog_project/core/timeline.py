@@ -0,0 +1,136 @@
+"""Fan-out-on-write home timelines.
+
+Publishing a post copies a ``TimelineEntry`` into the timeline of the author
+and every follower, in bounded batches. Authors with very large audiences are
+not fanned out; their posts are merged into readers' feeds at read time
+instead, so one celebrity post never turns into millions of inserts.
+"""
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Follow, Post, TimelineEntry
+from .pagination import FEED_PAGE_SIZE, after_cursor
+
+# rows per bulk insert while fanning a post out to followers
+FANOUT_BATCH_SIZE = 1000
+# authors with at least this many followers are merged on read instead
+FANOUT_FOLLOWER_LIMIT = 5000
+# most recent posts copied into a timeline when a new follow starts
+FOLLOW_BACKFILL_LIMIT = 200
+
+EXEMPT_AUTHORS_CACHE_KEY = 'timeline:fanout_exempt_authors'
+EXEMPT_AUTHORS_TTL = 600
+
+
+def is_fanout_exempt(user_id):
+    return Follow.objects.filter(following_id=user_id).count() >= FANOUT_FOLLOWER_LIMIT
+
+
+def fanout_exempt_author_ids():
+    """Ids of authors whose posts are merged at read time (cached)."""
+    ids = cache.get(EXEMPT_AUTHORS_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            Follow.objects.values('following_id')
+            .annotate(n=Count('id'))
+            .filter(n__gte=FANOUT_FOLLOWER_LIMIT)
+            .values_list('following_id', flat=True)
+        )
+        cache.set(EXEMPT_AUTHORS_CACHE_KEY, ids, EXEMPT_AUTHORS_TTL)
+    return ids
+
+
+def _follower_id_batches(author_id):
+    """Yield follower ids of ``author_id`` in FANOUT_BATCH_SIZE chunks (keyset on Follow.id)."""
+    last_id = 0
+    while True:
+        rows = list(
+            Follow.objects.filter(following_id=author_id, id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'follower_id')[:FANOUT_BATCH_SIZE]
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [follower_id for _, follower_id in rows]
+
+
+def fan_out_post(post):
+    """Write ``post`` into its author's and followers' timelines."""
+    if post.status != 'published':
+        return
+
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=post.user_id, post=post, created_at=post.created_at)],
+        ignore_conflicts=True
+    )
+
+    if is_fanout_exempt(post.user_id):
+        # make sure readers merge this author in even before the cache expires
+        exempt = fanout_exempt_author_ids()
+        if post.user_id not in exempt:
+            cache.set(EXEMPT_AUTHORS_CACHE_KEY, exempt | {post.user_id}, EXEMPT_AUTHORS_TTL)
+        return
+
+    for follower_ids in _follower_id_batches(post.user_id):
+        TimelineEntry.objects.bulk_create(
+            [TimelineEntry(user_id=uid, post=post, created_at=post.created_at) for uid in follower_ids],
+            ignore_conflicts=True
+        )
+
+
+def remove_post(post):
+    """Pull ``post`` out of every timeline (e.g. it went back to draft)."""
+    TimelineEntry.objects.filter(post=post).delete()
+
+
+def backfill_follow(follower_id, following_id):
+    """Copy the newly followed author's recent posts into the follower's timeline."""
+    if following_id in fanout_exempt_author_ids():
+        return
+
+    recent = (
+        Post.objects.filter(user_id=following_id, status='published')
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:FOLLOW_BACKFILL_LIMIT]
+    )
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=follower_id, post_id=pid, created_at=created) for pid, created in recent],
+        ignore_conflicts=True
+    )
+
+
+def prune_follow(follower_id, following_id):
+    """Drop the unfollowed author's posts from the follower's timeline."""
+    TimelineEntry.objects.filter(user_id=follower_id, post__user_id=following_id).delete()
+
+
+def timeline_post_ids(user, cursor=None, page_size=FEED_PAGE_SIZE):
+    """Return up to ``page_size + 1`` post ids for ``user``'s feed after ``cursor``.
+
+    Ids come back newest first. Materialized entries are one range scan on
+    (user, created_at, post); posts by followed fan-out-exempt authors are
+    merged in from the Post table on the same key.
+    """
+    limit = page_size + 1
+    keys = list(
+        after_cursor(TimelineEntry.objects.filter(user=user), cursor, id_field='post_id')
+        .order_by('-created_at', '-post_id')
+        .values_list('created_at', 'post_id')[:limit]
+    )
+
+    exempt = fanout_exempt_author_ids()
+    if exempt:
+        followed_exempt = list(
+            Follow.objects.filter(follower=user, following_id__in=exempt)
+            .values_list('following_id', flat=True)
+        )
+        if followed_exempt:
+            keys += list(
+                after_cursor(Post.objects.filter(user_id__in=followed_exempt, status='published'), cursor)
+                .order_by('-created_at', '-id')
+                .values_list('created_at', 'id')[:limit]
+            )
+            keys = sorted(set(keys), reverse=True)[:limit]
+
+    return [post_id for _, post_id in keys]
@@ -5,6 +5,7 @@ from . import views
 urlpatterns = [
 	# Home / Auth
 	path('', views.home, name='home'),
+	path('feed/more/', views.home_feed_more, name='home_feed_more'),
 	path('register/', views.register, name='register'),
 	path('login/', views.login_view, name='login'),
 	path('logout/', views.logout_view, name='logout'),
@@ -53,6 +54,7 @@ urlpatterns = [
 	path('notifications/', views.notifications, name='notifications'),
 	path('notifications/mark-read/', views.mark_notifications_read, name='mark_notifications_read'),
 	path('notifications/dropdown/', views.notification_dropdown, name='notification_dropdown'),
+	path('notifications/stream/', views.notification_stream, name='notification_stream'),
 	path('notifications/<int:id>/redirect/', views.notification_redirect, name='notification_redirect'),
 
 	# Community URLs (single canonical set)
@@ -70,9 +72,12 @@ urlpatterns = [
 	# Messages
 	path('messages/', views.messages_list, name='messages'),
 	path('messages/<str:username>/', views.conversation, name='conversation'),
+	path('messages/<str:username>/new/', views.conversation_messages, name='conversation_messages'),
 
 	# Search
 	path('search/', views.search, name='search'),
+	path('search/users/', views.user_typeahead, name='user_typeahead'),
+	path('leaderboard/', views.leaderboard, name='leaderboard'),
 
 	# Debug / misc
 	path('debug/profile-files/', views.list_profile_files, name='list_profile_files'),
@@ -15,25 +15,39 @@ def analyze_post_quality(text):
     return min(score, 100)
 
 import math
-from .models import Follow, Post, Like, Comment, Profile
+from .models import Profile
 
 
-def calculate_engagement_score(user):
-    followers_count = Follow.objects.filter(following=user).count()
+# engagement = sum of log1p(count) * weight, normalized by MAX_EXPECTED
+ENGAGEMENT_WEIGHTS = {'followers': 30, 'likes': 40, 'comments': 30}
+ENGAGEMENT_MAX_EXPECTED = 300  # tune later
 
-    posts = Post.objects.filter(user=user)
-    likes = Like.objects.filter(post__in=posts).count()
-    comments = Comment.objects.filter(post__in=posts).count()
 
+def engagement_from_counts(followers_count, likes, comments):
     raw_score = (
-        math.log1p(followers_count) * 30 +
-        math.log1p(likes) * 40 +
-        math.log1p(comments) * 30
+        math.log1p(followers_count) * ENGAGEMENT_WEIGHTS['followers'] +
+        math.log1p(likes) * ENGAGEMENT_WEIGHTS['likes'] +
+        math.log1p(comments) * ENGAGEMENT_WEIGHTS['comments']
     )
 
     # 🔑 NORMALIZE to 0.0 – 1.0
-    MAX_EXPECTED = 300  # tune later
-    return min(1.0, raw_score / MAX_EXPECTED)
+    return min(1.0, raw_score / ENGAGEMENT_MAX_EXPECTED)
+
+
+def profile_engagement_score(profile):
+    """Engagement from the counters kept on ``profile`` (no COUNT queries)."""
+    return engagement_from_counts(
+        profile.followers_count,
+        profile.likes_received_count,
+        profile.comments_received_count,
+    )
+
+
+def calculate_engagement_score(user):
+    profile = Profile.objects.only(
+        'followers_count', 'likes_received_count', 'comments_received_count'
+    ).get(user=user)
+    return profile_engagement_score(profile)
 
 
 def assign_level(score):
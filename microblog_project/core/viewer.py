@@ -0,0 +1,58 @@
+"""Request-scoped viewer state.
+
+``ViewerContextMiddleware`` attaches a ``ViewerContext`` as
+``request.viewer``. Views and context processors read the viewer's profile,
+notifications and follow set through it, so each is loaded at most once per
+request no matter how many places use it.
+"""
+from functools import cached_property
+
+from .models import Follow, Notification, Profile
+from .notifications import unread_count
+
+RECENT_NOTIFICATIONS_LIMIT = 10
+
+
+class ViewerContext:
+    def __init__(self, request):
+        self.user = request.user
+
+    @property
+    def is_authenticated(self):
+        return self.user.is_authenticated
+
+    @cached_property
+    def profile(self):
+        if not self.is_authenticated:
+            return None
+        profile = Profile.objects.filter(user=self.user).first()
+        if profile is None:
+            profile, _ = Profile.objects.get_or_create(user=self.user)
+        return profile
+
+    @cached_property
+    def unread_notifications_count(self):
+        if not self.is_authenticated:
+            return 0
+        return unread_count(self.user.id)
+
+    @cached_property
+    def recent_notifications(self):
+        """Latest notifications; a queryset, so it only hits the DB if iterated (once)."""
+        if not self.is_authenticated:
+            return Notification.objects.none()
+        return Notification.objects.filter(recipient=self.user).order_by('-created_at')[:RECENT_NOTIFICATIONS_LIMIT]
+
+    @cached_property
+    def following_ids(self):
+        if not self.is_authenticated:
+            return set()
+        return set(Follow.objects.filter(follower=self.user).values_list('following_id', flat=True))
+
+
+def get_viewer(request):
+    """``request.viewer``, created on first use when the middleware did not run."""
+    viewer = getattr(request, 'viewer', None)
+    if viewer is None:
+        viewer = request.viewer = ViewerContext(request)
+    return viewer
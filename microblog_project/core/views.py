@@ -1,17 +1,17 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Count, Prefetch, Q
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.template.loader import render_to_string
 
+import asyncio
+import json
 import os
 import logging
-import re
-from collections import Counter
 from django.db import transaction, IntegrityError
 
 from .models import (
@@ -20,12 +20,74 @@ from .models import (
     CommunityComment, CommunityPostLike, Profile, Bookmark
 )
 from .forms import EditUserForm, ProfilePhotoForm
+from .pagination import FEED_PAGE_SIZE, after_cursor, decode_cursor, page_from_rows
+from .timeline import timeline_post_ids
+from .loaders import attach_comment_trees, attach_community_comments, viewer_state
+from .hashtags import extract_hashtags
+from .sidebar import sidebar_context
+from .viewer import get_viewer
+from .notifications import NOTIFICATIONS_PAGE_SIZE, mark_all_read, mark_read
+from .realtime import get_fanout
+from .messaging import (
+    CONVERSATION_PAGE_SIZE, conversation_page, inbox_page, mark_conversation_read,
+    message_payload, messages_since, send_message,
+)
+from .leaderboard import LEADERBOARD_PAGE_SIZE, leaderboard_page, rank_of
+from .search import SEARCH_PAGE_SIZE, cached_search_post_ids, classify_query, suggest_users, suggest_users_for_terms
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+def _home_feed_page(request, cursor, include_communities):
+    """Build one keyset page of the home feed.
+
+    Returns ``(posts, next_cursor)``. Members read their materialized
+    timeline (see core.timeline); guests get every published post. Community
+    posts are merged in on the same ``(created_at, id)`` key when the toggle
+    is on.
+    """
+    posts = Post.objects.select_related('user', 'user__profile')
+
+    if request.user.is_authenticated:
+        # Feed: one range scan over the viewer's timeline entries
+        post_ids = timeline_post_ids(request.user, cursor, FEED_PAGE_SIZE)
+        by_id = posts.in_bulk(post_ids)
+        posts_list = [by_id[pid] for pid in post_ids if pid in by_id]
+    else:
+        posts_list = list(
+            after_cursor(posts.filter(status='published'), cursor)
+            .order_by('-created_at', '-id')[:FEED_PAGE_SIZE + 1]
+        )
+
+    for p in posts_list:
+        p.is_community = False
+
+    # =========================
+    # COMMUNITY POSTS (OPTIONAL)
+    # =========================
+    if include_communities:
+        community_posts = after_cursor(
+            CommunityPost.objects.select_related('user', 'user__profile', 'community')
+            .annotate(like_total=Count('likes')),
+            cursor
+        ).order_by('-created_at', '-id')[:FEED_PAGE_SIZE + 1]
+
+        for cp in community_posts:
+            cp.is_community = True
+            cp.community_obj = cp.community
+            cp.like_count = cp.like_total
+            posts_list.append(cp)
+
+        posts_list.sort(key=lambda x: (x.created_at, x.id), reverse=True)
+
+    posts_list, next_cursor = page_from_rows(posts_list, FEED_PAGE_SIZE)
+    attach_comment_trees(posts_list)
+    attach_community_comments(posts_list)
+    return posts_list, next_cursor
+
+
 def home(request):
     # =========================
     # TOGGLE COMMUNITY POSTS
@@ -36,150 +98,57 @@ def home(request):
         return redirect('home')
 
     include_communities = request.session.get('include_communities', False)
+    cursor = decode_cursor(request.GET.get('cursor'))
 
     # =========================
     # DEFAULT CONTEXT
     # =========================
-    posts = []
     users = []
-    following_ids = []
-    liked_posts = []
-    liked_comments = []
-    unread_notifications = []
-    unread_notifications_count = 0
-    bookmarked_posts = []
+    # viewer state is memoized on the request and shared with the context processors
+    viewer = get_viewer(request)
 
     # =========================
     # AUTHENTICATED USER LOGIC
     # =========================
     if request.user.is_authenticated:
-        # Notifications
-        unread_notifications = Notification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        ).order_by('-created_at')
-        unread_notifications_count = unread_notifications.count()
-
-        # Following
-        following_ids = list(
-            Follow.objects.filter(
-                follower=request.user
-            ).values_list('following_id', flat=True)
-        )
-
-        # Feed: followed users + self
-        posts = Post.objects.filter(
-            user__in=following_ids + [request.user.id],
-            status='published'
-        ).select_related('user').annotate(
-            like_count=Count('likes', distinct=True),
-            comment_count=Count('comments', distinct=True),
-            bookmark_count=Count('bookmarks', distinct=True)
-        ).order_by('-created_at')
-
         # People section
         users = User.objects.exclude(id=request.user.id)[:20]
 
-        # Likes
-        liked_posts = list(
-            Like.objects.filter(user=request.user)
-            .values_list('post_id', flat=True)
-        )
-        # Bookmarks
-        bookmarked_posts = list(
-            Bookmark.objects.filter(user=request.user)
-            .values_list('post_id', flat=True)
-        )
-
-        # Comment likes
-        liked_comments = list(
-            CommentLike.objects.filter(user=request.user)
-            .values_list('comment_id', flat=True)
-        )
-
-    # =========================
-    # GUEST USER LOGIC
-    # =========================
-    else:
-        posts = Post.objects.filter(
-            status='published'
-        ).select_related('user').annotate(
-            like_count=Count('likes', distinct=True),
-            comment_count=Count('comments', distinct=True),
-            bookmark_count=Count('bookmarks', distinct=True)
-        ).order_by('-created_at')
+    posts_list, next_cursor = _home_feed_page(request, cursor, include_communities)
 
     # =========================
-    # TRENDING HASHTAGS
-    # =========================
-    recent_posts = Post.objects.filter(
-        status='published'
-    ).order_by('-created_at')[:500]
-
-    hashtag_counter = Counter()
-    for p in recent_posts:
-        tags = re.findall(r"#(\w+)", p.content)
-        for t in tags:
-            hashtag_counter[t.lower()] += 1
-
-    top_hashtags = [h for h, c in hashtag_counter.most_common(8)]
-
-    # =========================
-    # TRENDING POSTS
-    # =========================
-    trending_posts = Post.objects.filter(
-        status='published'
-    ).annotate(
-        like_count=Count('likes')
-    ).select_related('user').order_by(
-        '-like_count', '-created_at'
-    )[:5]
-
-    # =========================
-    # COMMUNITY POSTS (OPTIONAL)
+    # FINAL RENDER
     # =========================
-    posts_list = list(posts)
+    return render(request, 'home.html', {
+        'posts': posts_list,
+        'next_cursor': next_cursor,
+        'users': users,
+        'unread_notifications_count': viewer.unread_notifications_count,
+        'include_communities': include_communities,
+        # trending hashtags / posts (cached, shared with post_detail and search)
+        **sidebar_context(),
+        **viewer_state(request.user, posts_list),
+    })
 
-    if include_communities:
-        from .models import CommunityPost
 
-        community_posts = CommunityPost.objects.select_related(
-            'user', 'community'
-        ).prefetch_related(
-            'comments'
-        ).order_by('-created_at')[:50]
+def home_feed_more(request):
+    """Next page of the home feed for "load more" / infinite scroll.
 
-        for cp in community_posts:
-            cp.is_community = True
-            cp.community_obj = cp.community
-            cp.like_count = 0
-            cp.comment_set = cp.comments
-
-        for p in posts_list:
-            p.is_community = False
-
-        posts_list.extend(list(community_posts))
-    else:
-        for p in posts_list:
-            p.is_community = False
+    Returns JSON: {html: rendered post cards, next_cursor: token or null}
+    """
+    include_communities = request.session.get('include_communities', False)
+    cursor = decode_cursor(request.GET.get('cursor'))
 
-    posts_list.sort(key=lambda x: x.created_at, reverse=True)
+    posts_list, next_cursor = _home_feed_page(request, cursor, include_communities)
 
-    # =========================
-    # FINAL RENDER
-    # =========================
-    return render(request, 'home.html', {
+    html = render_to_string('partials/feed_page.html', {
         'posts': posts_list,
-        'users': users,
-        'following_ids': following_ids,
-        'liked_posts': liked_posts,
-        'bookmarked_posts': bookmarked_posts,
-        'liked_comments': liked_comments,
-        'unread_notifications': unread_notifications,
-        'unread_notifications_count': unread_notifications_count,
-        'trending_hashtags': top_hashtags,
-        'trending_posts': trending_posts,
-        'include_communities': include_communities,
+        **viewer_state(request.user, posts_list),
+    }, request=request)
+
+    return JsonResponse({
+        'html': html,
+        'next_cursor': next_cursor,
     })
 
 
@@ -187,50 +156,24 @@ def home(request):
 def profile(request, username):
     profile_user = get_object_or_404(User, username=username)
 
-    posts = (
-        Post.objects
-        .filter(user=profile_user)
-        .select_related('user')
-        .annotate(
-            like_count=Count('likes', distinct=True),
-            comment_count=Count('comments', distinct=True),
-            bookmark_count=Count('bookmarks', distinct=True)
-        )
-        .order_by('-created_at')
-    )
     # Show drafts only to the profile owner
     if request.user == profile_user:
         posts_qs = Post.objects.filter(user=profile_user)
     else:
         posts_qs = Post.objects.filter(user=profile_user, status='published')
 
-    posts = posts_qs.select_related('user').annotate(
-        like_count=Count('likes', distinct=True),
-        comment_count=Count('comments', distinct=True),
-        bookmark_count=Count('bookmarks', distinct=True)
-    ).order_by('-created_at')
+    posts = list(posts_qs.select_related('user').order_by('-created_at'))
 
-    posts_count = posts.count()
+    posts_count = len(posts)
     followers_count = Follow.objects.filter(following=profile_user).count()
     following_count = Follow.objects.filter(follower=profile_user).count()
 
     is_following = False
     if request.user.is_authenticated and request.user != profile_user:
-        is_following = Follow.objects.filter(
-            follower=request.user,
-            following=profile_user
-        ).exists()
+        is_following = profile_user.id in get_viewer(request).following_ids
 
     profile, _ = Profile.objects.get_or_create(user=profile_user)
 
-    # likes/comments context for template (used to show liked state)
-    liked_posts = []
-    liked_comments = []
-    if request.user.is_authenticated:
-        liked_posts = list(Like.objects.filter(user=request.user).values_list('post_id', flat=True))
-        liked_comments = list(CommentLike.objects.filter(user=request.user).values_list('comment_id', flat=True))
-        bookmarked_posts = list(Bookmark.objects.filter(user=request.user).values_list('post_id', flat=True))
-
     photo_url = None
     try:
         if profile.photo and getattr(profile.photo, 'name', None):
@@ -248,9 +191,8 @@ def profile(request, username):
         'followers_count': followers_count,
         'following_count': following_count,
         'is_following': is_following,
-        'liked_posts': liked_posts,
-        'liked_comments': liked_comments,
-        'bookmarked_posts': bookmarked_posts if request.user.is_authenticated else [],
+        # likes/bookmarks context for template (used to show liked state)
+        **viewer_state(request.user, posts),
     }
 
     return render(request, 'core/profile.html', context)
@@ -261,43 +203,24 @@ def profile(request, username):
 # =========================
 
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related('user').annotate(
-        like_count=Count('likes', distinct=True),
-        comment_count=Count('comments', distinct=True)
-    ), id=post_id)
+    post = get_object_or_404(Post.objects.select_related('user'), id=post_id)
 
     # Prevent others from viewing drafts
     if post.status == 'draft' and (not request.user.is_authenticated or request.user != post.user):
         return redirect('home')
 
-    liked = False
-    if request.user.is_authenticated:
-        liked = Like.objects.filter(user=request.user, post=post).exists()
-    bookmarked = False
-    if request.user.is_authenticated:
-        bookmarked = Bookmark.objects.filter(user=request.user, post=post).exists()
+    state = viewer_state(request.user, [post])
+    liked = post.id in state['liked_posts']
+    bookmarked = post.id in state['bookmarked_posts']
 
     comments = Comment.objects.filter(post=post).select_related('user').order_by('created_at')
 
-    # compute trending hashtags and top posts for sidebar
-    import re
-    from collections import Counter
-    all_posts = Post.objects.filter(status='published').order_by('-created_at')[:500]
-    hashtag_counter = Counter()
-    for p in all_posts:
-        tags = re.findall(r"#(\w+)", p.content)
-        for t in tags:
-            hashtag_counter[t.lower()] += 1
-    top_hashtags = [h for h,c in hashtag_counter.most_common(8)]
-    top_posts = Post.objects.filter(status='published').annotate(like_count=Count('likes')).order_by('-like_count', '-created_at')[:5]
-
     context = {
         'post': post,
         'liked': liked,
         'bookmarked': bookmarked,
         'comments': comments,
-        'trending_hashtags': top_hashtags,
-        'trending_posts': top_posts,
+        **sidebar_context(),
     }
 
     return render(request, 'post_detail.html', context)
@@ -306,82 +229,76 @@ def post_detail(request, post_id):
 def search(request):
     q = request.GET.get('q', '') or ''
     q = q.strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
 
-    posts = Post.objects.none()
-    users = User.objects.none()
-    match_type = 'none'
-
-    if q == '':
-        # empty query -> show nothing
-        match_type = 'empty'
-    elif q.lower() == 'trending' or q.lower() == '#trending':
-        match_type = 'trending'
-        # annotate with like counts and order by popularity
-        posts = Post.objects.annotate(like_count=Count('likes')).order_by('-like_count', '-created_at')[:50]
-    elif q.startswith('@'):
-        match_type = 'user'
-        username = q[1:]
-        users = User.objects.filter(username__icontains=username)
-        posts = Post.objects.filter(user__in=users).order_by('-created_at')
-    elif q.startswith('#'):
-        match_type = 'hashtag'
-        tag = q[1:]
-        posts = Post.objects.filter(content__icontains=f"#{tag}").order_by('-created_at')
-    else:
-        match_type = 'keyword'
-        # split into words and search content and usernames
-        words = [w for w in q.split() if w]
-        if words:
-            q_filter = Q()
-            for w in words:
-                q_filter |= Q(content__icontains=w)
-                q_filter |= Q(user__username__icontains=w)
-            posts = Post.objects.filter(q_filter).distinct().order_by('-created_at')
-        users = User.objects.filter(username__icontains=q)
-
-    # annotate and select_related for better performance (avoid N+1 queries in templates)
+    match_type, term = classify_query(q)
+    users = []
+    if match_type == 'user':
+        users = suggest_users(term)
+    elif match_type == 'keyword':
+        users = suggest_users_for_terms(term.split())
+
+    # ids come from a short-lived cache shared by all viewers; only the
+    # posts themselves and the viewer's like/bookmark state are loaded here
+    ids = cached_search_post_ids(match_type, term, page)
+    # select_related for better performance (avoid N+1 queries in templates)
     # Only show published posts in search results
-    posts = posts.filter(status='published').select_related('user').annotate(
-        like_count=Count('likes', distinct=True),
-        comment_count=Count('comments', distinct=True)
-    )
-
-    liked_posts = []
-    if request.user.is_authenticated:
-        liked_posts = Like.objects.filter(user=request.user).values_list('post_id', flat=True)
+    by_id = Post.objects.filter(status='published').select_related('user').in_bulk(ids)
+    post_list = [by_id[pid] for pid in ids if pid in by_id]
+    has_next = len(ids) > SEARCH_PAGE_SIZE
+    post_list = post_list[:SEARCH_PAGE_SIZE]
 
     # Attach extracted tags per post for template convenience
-    import re
-    from collections import Counter
-
-    post_list = list(posts)
     for p in post_list:
-        p.tags = re.findall(r"#(\w+)", p.content)
-
-    # compute trending hashtags and top posts for sidebar
-    all_posts = Post.objects.all()
-    all_posts = Post.objects.filter(status='published')
-    hashtag_counter = Counter()
-    for p in all_posts:
-        tags = re.findall(r"#(\w+)", p.content)
-        for t in tags:
-            hashtag_counter[t.lower()] += 1
-    top_hashtags = [h for h,c in hashtag_counter.most_common(8)]
-    top_posts = Post.objects.filter(status='published').annotate(like_count=Count('likes')).order_by('-like_count', '-created_at')[:5]
+        p.tags = extract_hashtags(p.content)
 
     context = {
-        'posts': posts,
+        'posts': post_list,
         'users': users,
         'query': q,
         'match_type': match_type,
-        'liked_posts': liked_posts,
-        'trending_hashtags': top_hashtags,
-        'trending_posts': top_posts,
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+        'previous_page': page - 1 if page > 1 else None,
+        **viewer_state(request.user, post_list),
+        **sidebar_context(),
     }
 
     return render(request, 'search_results.html', context)
 
 
+def user_typeahead(request):
+    """JSON list of users whose name starts with ``?q=`` (for search-box suggestions)."""
+    return JsonResponse({'results': suggest_users(request.GET.get('q', ''))})
+
+
+def leaderboard(request):
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    profiles, has_next = leaderboard_page(page)
+    first_rank = (page - 1) * LEADERBOARD_PAGE_SIZE + 1
+
+    my_rank = None
+    if request.user.is_authenticated:
+        my_profile = Profile.objects.filter(user=request.user).only('id', 'reputation_score').first()
+        if my_profile:
+            my_rank = rank_of(my_profile)
+
+    return render(request, 'leaderboard.html', {
+        'ranked_profiles': [(first_rank + i, p) for i, p in enumerate(profiles)],
+        'my_rank': my_rank,
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+        'previous_page': page - 1 if page > 1 else None,
+    })
+
+
 def register(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -490,13 +407,7 @@ def follow_user(request, user_id):
         ).first()
         created = bool(follow_obj)
 
-    if created:
-        Notification.objects.create(
-            sender=request.user,
-            recipient=target,
-            notification_type='follow'
-        )
-
+    # the follow notification is created by core.signals (grouped, idempotent)
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         # return JSON so frontend JS doesn't choke on redirects
         return JsonResponse({
@@ -560,14 +471,8 @@ def unfollow_user(request, user_id):
 def like_post(request, post_id):
     post = get_object_or_404(Post, id=post_id)
 
-    like, created = Like.objects.get_or_create(user=request.user, post=post)
-    if created and post.user != request.user:
-        Notification.objects.create(
-            sender=request.user,
-            recipient=post.user,
-            notification_type='like',
-            post=post
-        )
+    # the like notification is created by core.signals (grouped, idempotent)
+    Like.objects.get_or_create(user=request.user, post=post)
     # Prefer returning to referring page, fallback to home
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
@@ -593,8 +498,9 @@ def bookmark_post(request, post_id):
     except Exception:
         created = False
 
-    # compute new count
-    count = Bookmark.objects.filter(post=post).count()
+    # read the maintained counter back
+    post.refresh_from_db(fields=['bookmark_count'])
+    count = post.bookmark_count
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({'status': 'ok', 'action': 'bookmarked', 'post_id': post.id, 'bookmark_count': count, 'created': created})
@@ -627,7 +533,8 @@ def toggle_bookmark(request, post_id):
         # Concurrent create might raise; ensure state is consistent
         bookmarked = Bookmark.objects.filter(user=request.user, post=post).exists()
 
-    count = Bookmark.objects.filter(post=post).count()
+    post.refresh_from_db(fields=['bookmark_count'])
+    count = post.bookmark_count
 
     return JsonResponse({
         'status': 'ok',
@@ -644,7 +551,8 @@ def unbookmark_post(request, post_id):
         return JsonResponse({'status': 'error', 'message': 'Invalid method'}, status=405)
 
     deleted = Bookmark.objects.filter(user=request.user, post=post).delete()[0]
-    count = Bookmark.objects.filter(post=post).count()
+    post.refresh_from_db(fields=['bookmark_count'])
+    count = post.bookmark_count
 
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         return JsonResponse({'status': 'ok', 'action': 'unbookmarked', 'post_id': post.id, 'bookmark_count': count, 'deleted': bool(deleted)})
@@ -654,16 +562,15 @@ def unbookmark_post(request, post_id):
 
 @login_required
 def bookmarks(request):
-    posts = Post.objects.filter(bookmarks__user=request.user, status='published').select_related('user').annotate(
-        like_count=Count('likes', distinct=True),
-        comment_count=Count('comments', distinct=True)
-    ).order_by('-created_at')
-
-    liked_posts = list(Like.objects.filter(user=request.user).values_list('post_id', flat=True))
+    posts = list(
+        Post.objects.filter(bookmarks__user=request.user, status='published')
+        .select_related('user', 'user__profile')
+        .order_by('-created_at')
+    )
 
     return render(request, 'core/bookmarks.html', {
         'posts': posts,
-        'liked_posts': liked_posts,
+        **viewer_state(request.user, posts),
     })
 
 # =========================
@@ -684,14 +591,6 @@ def add_comment(request, post_id):
                 text=text
             )
 
-            if post.user != request.user:
-                Notification.objects.create(
-                    sender=request.user,
-                    recipient=post.user,
-                    notification_type='comment',
-                    post=post
-                )
-
     # Redirect back to the page that submitted the comment (profile, post detail, home, etc.)
     return redirect('home')
 
@@ -791,19 +690,31 @@ def toggle_comment_like(request, comment_id):
 
 @login_required
 def notifications(request):
-    # show notifications received by the user
-    notifications_qs = Notification.objects.filter(recipient=request.user).order_by('-created_at')
+    # show notifications received by the user, one bounded page at a time
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    offset = (page - 1) * NOTIFICATIONS_PAGE_SIZE
+    rows = list(
+        Notification.objects.filter(recipient=request.user)
+        .select_related('sender', 'post')
+        .order_by('-created_at')[offset:offset + NOTIFICATIONS_PAGE_SIZE + 1]
+    )
+    has_next = len(rows) > NOTIFICATIONS_PAGE_SIZE
+
     return render(request, 'core/notifications.html', {
-        'notifications': notifications_qs
+        'notifications': rows[:NOTIFICATIONS_PAGE_SIZE],
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+        'previous_page': page - 1 if page > 1 else None,
     })
 
 
 @login_required
 def mark_notifications_read(request):
-    Notification.objects.filter(
-        recipient=request.user,
-        is_read=False
-    ).update(is_read=True)
+    mark_all_read(request.user.id)
 
     return JsonResponse({"status": "ok"})
 
@@ -813,39 +724,18 @@ def mark_notifications_read(request):
 
 @login_required
 def messages_list(request):
-    sent_to = Message.objects.filter(sender=request.user).values_list('recipient', flat=True)
-    received_from = Message.objects.filter(recipient=request.user).values_list('sender', flat=True)
-
-    users = User.objects.filter(
-        Q(id__in=sent_to) | Q(id__in=received_from)
-    ).exclude(id=request.user.id)
-
-    conversations = []
-    for user in users:
-        last_message = Message.objects.filter(
-            Q(sender=request.user, recipient=user) |
-            Q(sender=user, recipient=request.user)
-        ).order_by('-created_at').first()
-
-        unread_count = Message.objects.filter(
-            sender=user,
-            recipient=request.user,
-            is_read=False
-        ).count()
-
-        conversations.append({
-            'user': user,
-            'last_message': last_message,
-            'unread_count': unread_count
-        })
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
 
-    conversations.sort(
-        key=lambda x: x['last_message'].created_at if x['last_message'] else x['user'].date_joined,
-        reverse=True
-    )
+    conversations, has_next = inbox_page(request.user.id, page)
 
     return render(request, 'core/messages.html', {
-        'conversations': conversations
+        'conversations': conversations,
+        'page': page,
+        'next_page': page + 1 if has_next else None,
+        'previous_page': page - 1 if page > 1 else None,
     })
 
 
@@ -853,30 +743,45 @@ def messages_list(request):
 def conversation(request, username):
     other_user = get_object_or_404(User, username=username)
 
-    Message.objects.filter(
-        sender=other_user,
-        recipient=request.user,
-        is_read=False
-    ).update(is_read=True)
-
-    messages_list = Message.objects.filter(
-        Q(sender=request.user, recipient=other_user) |
-        Q(sender=other_user, recipient=request.user)
-    ).order_by('created_at')
-
     if request.method == 'POST':
         content = request.POST.get('content', '').strip()
-        if content:
-            Message.objects.create(
-                sender=request.user,
-                recipient=other_user,
-                content=content
-            )
-            return redirect('conversation', username=username)
+        message = send_message(request.user.id, other_user.id, content) if content else None
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            if message is None:
+                return JsonResponse({'error': 'empty message'}, status=400)
+            return JsonResponse({'message': message_payload(message)})
+        return redirect('conversation', username=username)
+
+    mark_conversation_read(request.user.id, other_user.id)
+
+    before = request.GET.get('before')
+    messages_list, older_cursor = conversation_page(request.user.id, other_user.id, before)
 
     return render(request, 'core/conversation.html', {
         'other_user': other_user,
-        'messages': messages_list
+        'messages': messages_list,
+        'older_cursor': older_cursor,
+        'is_latest_page': not before,
+    })
+
+
+@login_required
+def conversation_messages(request, username):
+    """JSON: messages of the conversation after ``?since=<message id>``."""
+    other_user = get_object_or_404(User, username=username)
+    since = request.GET.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        return JsonResponse({'error': 'invalid since'}, status=400)
+
+    new_messages = messages_since(request.user.id, other_user.id, since)
+    if any(m.sender_id == other_user.id and not m.is_read for m in new_messages):
+        mark_conversation_read(request.user.id, other_user.id)
+
+    return JsonResponse({
+        'messages': [message_payload(m) for m in new_messages],
+        'has_more': len(new_messages) == CONVERSATION_PAGE_SIZE,
     })
 
 
@@ -887,13 +792,13 @@ from core.models import Notification
 
 @login_required
 def notification_dropdown(request):
-    all_notifications = Notification.objects.filter(
-        recipient=request.user
-    )
+    # unread count comes from the request's viewer cache, shared with the
+    # (lazy) notifications context processor used by render_to_string below
+    unread_count = get_viewer(request).unread_notifications_count
 
-    unread_count = all_notifications.filter(is_read=False).count()
-
-    notifications = all_notifications.order_by('-created_at')[:5]
+    notifications = Notification.objects.filter(
+        recipient=request.user
+    ).select_related('sender').order_by('-created_at')[:5]
 
     html = render_to_string(
         "notifications/dropdown.html",
@@ -905,6 +810,41 @@ def notification_dropdown(request):
         "html": html,
         "count": unread_count
     })
+
+
+NOTIFICATION_STREAM_KEEPALIVE = 25
+
+
+async def notification_stream(request):
+    """Server-sent events: pushes ``notification`` events to the signed-in user.
+
+    Needs the ASGI server (asgi.py); under WSGI each open stream would pin a
+    worker thread.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    async def events():
+        # ask EventSource to reconnect after 5s if the connection drops
+        yield "retry: 5000\n\n"
+        async with get_fanout().subscribe(user.id) as queue:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), NOTIFICATION_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event['type'] != 'notification':
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 from django.shortcuts import get_object_or_404, redirect
 
 @login_required
@@ -915,8 +855,7 @@ def notification_redirect(request, id):
         recipient=request.user
     )
 
-    notification.is_read = True
-    notification.save()
+    mark_read(notification)
 
     return redirect(notification.get_redirect_url())
     return redirect(request.META.get('HTTP_REFERER', 'home'))
@@ -1016,10 +955,7 @@ def edit_profile(request):
     
 @login_required
 def drafts(request):
-    drafts_qs = Post.objects.filter(user=request.user, status='draft').select_related('user').annotate(
-        like_count=Count('likes', distinct=True),
-        comment_count=Count('comments', distinct=True)
-    ).order_by('-created_at')
+    drafts_qs = Post.objects.filter(user=request.user, status='draft').select_related('user').order_by('-created_at')
 
     context = {'drafts': drafts_qs}
     return render(request, 'drafts.html', context)
@@ -1298,7 +1234,11 @@ def community_detail(request, community_id):
     posts = (
         community.posts
         .select_related("user")
-        .prefetch_related("comments__user", "likes")
+        .annotate(like_total=Count("likes"))
+        .prefetch_related(Prefetch(
+            "comments",
+            queryset=CommunityComment.objects.select_related("user").order_by("created_at", "id")
+        ))
         .order_by("-created_at")
         if can_post else []
     )
@@ -1316,7 +1256,11 @@ def community_detail(request, community_id):
     posts = (
         community.posts
         .select_related("user")
-        .prefetch_related("comments__user", "likes")
+        .annotate(like_total=Count("likes"))
+        .prefetch_related(Prefetch(
+            "comments",
+            queryset=CommunityComment.objects.select_related("user").order_by("created_at", "id")
+        ))
         .order_by("-created_at")
         if can_post else []
     )
@@ -51,6 +51,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ViewerContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +91,36 @@ DATABASES = {
 }
 
 
+# Cache
+# Sidebar, leaderboard and search caches live here. Set REDIS_URL in
+# production so every worker shares one copy; local/dev falls back to
+# per-process memory.
+
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Reputation recalculation is queued and run by the run_reputation_worker
+# command (the Procfile's worker process); set REPUTATION_RECALC_INLINE=1 to
+# recalculate inside the request where no worker runs.
+REPUTATION_RECALC_INLINE = os.environ.get('REPUTATION_RECALC_INLINE') == '1'
+
+# Fan-out for pushed notifications and direct messages (core.realtime). The in-memory default only
+# reaches clients of the same process, which is why the Procfile pins gunicorn to
+# one worker; point this at a broker-backed class before running more than one.
+REALTIME_FANOUT_BACKEND = os.environ.get('REALTIME_FANOUT_BACKEND', 'core.realtime.InMemoryFanout')
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
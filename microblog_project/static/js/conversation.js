@@ -0,0 +1,152 @@
+// Conversation page: messages go over the DM socket (/ws/messages/) when it
+// is open; otherwise they are posted with fetch and new ones are polled
+// after the last one shown (?since=<id>).
+document.addEventListener('DOMContentLoaded', function() {
+    const container = document.getElementById('messagesContainer');
+    const list = document.getElementById('messagesList');
+    const form = document.querySelector('.message-form');
+    const textarea = document.getElementById('messageInput');
+    const POLL_INTERVAL = 5000;
+
+    // Auto-scroll to bottom on load
+    if (container) {
+        container.scrollTop = container.scrollHeight;
+    }
+
+    // Auto-resize textarea
+    if (textarea) {
+        textarea.addEventListener('input', function() {
+            this.style.height = 'auto';
+            this.style.height = Math.min(this.scrollHeight, 120) + 'px';
+        });
+    }
+
+    // Older pages are static; only the latest page follows the conversation
+    const newUrl = container && container.dataset.newUrl;
+    if (!newUrl || !list || !form) return;
+
+    const me = Number(container.dataset.me);
+    const otherId = Number(container.dataset.otherId);
+    const otherName = container.dataset.otherName;
+    const SOCKET_RETRY = 5000;
+    let socket = null;
+    let clientSeq = 0;
+
+    function lastId() {
+        const items = list.querySelectorAll('.message-item[data-id]');
+        return items.length ? items[items.length - 1].dataset.id : null;
+    }
+
+    function el(tag, className, text) {
+        const node = document.createElement(tag);
+        node.className = className;
+        if (text !== undefined) node.textContent = text;
+        return node;
+    }
+
+    function append(message) {
+        if (list.querySelector('.message-item[data-id="' + message.id + '"]')) return;
+        const mine = message.sender_id === me;
+        const item = el('div', 'message-item ' + (mine ? 'message-sent' : 'message-received'));
+        item.dataset.id = message.id;
+        if (!mine) item.appendChild(el('div', 'message-avatar', otherName.charAt(0).toUpperCase()));
+        const bubble = el('div', 'message-bubble');
+        if (!mine) bubble.appendChild(el('div', 'message-sender-name', otherName));
+        bubble.appendChild(el('div', 'message-text', message.content));
+        bubble.appendChild(el('div', 'message-time', 'just now'));
+        item.appendChild(bubble);
+        list.appendChild(item);
+
+        const empty = document.getElementById('noMessagesYet');
+        if (empty) empty.remove();
+        container.scrollTop = container.scrollHeight;
+    }
+
+    let fetching = false;
+    async function fetchNew() {
+        if (fetching) return;
+        fetching = true;
+        try {
+            let more = true;
+            while (more) {
+                const since = lastId();
+                const res = await fetch(since ? newUrl + '?since=' + encodeURIComponent(since) : newUrl, {
+                    headers: { 'X-Requested-With': 'XMLHttpRequest' },
+                    credentials: 'same-origin'
+                });
+                const data = await res.json();
+                (data.messages || []).forEach(append);
+                more = data.has_more;
+            }
+        } catch (err) {
+            console.error('Fetching new messages failed', err);
+        } finally {
+            fetching = false;
+        }
+    }
+
+    function connect() {
+        const scheme = location.protocol === 'https:' ? 'wss://' : 'ws://';
+        const ws = new WebSocket(scheme + location.host + '/ws/messages/');
+        ws.addEventListener('open', function() {
+            socket = ws;
+            // catch up on anything sent while we were not connected
+            fetchNew();
+        });
+        ws.addEventListener('message', function(e) {
+            const data = JSON.parse(e.data);
+            if (data.type === 'ack') {
+                append(data.message);
+            } else if (data.type === 'message' && data.message.sender_id === otherId) {
+                append(data.message);
+                // the server batches these into one update
+                ws.send(JSON.stringify({ type: 'read', message_ids: [data.message.id] }));
+            } else if (data.type === 'message' && data.message.recipient_id === otherId) {
+                // sent from another of our tabs (append skips ids already shown)
+                append(data.message);
+            } else if (data.type === 'read' && data.reader_id === otherId) {
+                data.message_ids.forEach(function(id) {
+                    const item = list.querySelector('.message-item[data-id="' + id + '"]');
+                    if (item) item.classList.add('message-read');
+                });
+            }
+        });
+        ws.addEventListener('close', function() {
+            socket = null;
+            setTimeout(connect, SOCKET_RETRY);
+        });
+    }
+
+    form.addEventListener('submit', async function(e) {
+        e.preventDefault();
+        const content = textarea.value.trim();
+        if (!content) return;
+        textarea.value = '';
+        textarea.style.height = 'auto';
+
+        if (socket) {
+            socket.send(JSON.stringify({ type: 'send', to: otherId, content: content, client_id: ++clientSeq }));
+            return;
+        }
+        const body = new FormData(form);
+        body.set('content', content);
+        const res = await fetch(form.action, {
+            method: 'POST',
+            body: body,
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            credentials: 'same-origin'
+        });
+        if (!res.ok) return;
+        const data = await res.json();
+        // pick up anything that arrived before our own message first
+        await fetchNew();
+        append(data.message);
+    });
+
+    if (window.WebSocket) connect();
+
+    // fallback while the socket is down
+    setInterval(function() {
+        if (!socket && !document.hidden) fetchNew();
+    }, POLL_INTERVAL);
+});
@@ -0,0 +1,34 @@
+(function(){
+    // Keyset pagination for the home feed: fetch the next page by cursor and
+    // append the rendered post cards instead of reloading the whole page.
+    document.addEventListener('click', function(e){
+        const btn = e.target.closest('.load-more-btn');
+        if (!btn) return;
+        e.preventDefault();
+
+        const url = btn.getAttribute('data-more-url');
+        const cursor = btn.getAttribute('data-cursor');
+        if (!url || !cursor || btn.dataset.loading === '1') return;
+        btn.dataset.loading = '1';
+
+        fetch(url + '?cursor=' + encodeURIComponent(cursor), {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' },
+            credentials: 'same-origin'
+        }).then(r => r.json()).then(json => {
+            const list = document.querySelector('section.posts-list');
+            if (list && json.html) list.insertAdjacentHTML('beforeend', json.html);
+
+            if (json.next_cursor) {
+                btn.setAttribute('data-cursor', json.next_cursor);
+                btn.setAttribute('href', '?cursor=' + json.next_cursor);
+            } else {
+                const wrap = btn.closest('.feed-more');
+                if (wrap) wrap.remove();
+            }
+        }).catch(err => {
+            console.error('Loading more posts failed', err);
+        }).finally(() => {
+            btn.dataset.loading = '0';
+        });
+    });
+})();
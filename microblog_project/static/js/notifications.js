@@ -4,20 +4,77 @@ document.addEventListener("DOMContentLoaded", () => {
 
     if (!bell || !popup) return;
 
+    const POLL_INTERVAL = 60000;
+    let pollTimer = null;
+    // dropdown HTML is refetched only when something changed since the last fetch
+    let stale = true;
+
+    function setCount(count) {
+        let countEl = bell.querySelector(".notification-count");
+        if (count > 0) {
+            if (!countEl) {
+                countEl = document.createElement("span");
+                countEl.className = "notification-count";
+                bell.appendChild(countEl);
+            }
+            countEl.textContent = count;
+        } else if (countEl) {
+            countEl.remove();
+        }
+    }
+
+    async function loadDropdown() {
+        const res = await fetch("/notifications/dropdown/");
+        const data = await res.json();
+        popup.innerHTML = data.html;
+        stale = false;
+        return data;
+    }
+
+    // Fallback while no push connection is open
+    function startPolling() {
+        if (pollTimer) return;
+        pollTimer = setInterval(async () => {
+            const data = await loadDropdown();
+            if (!popup.classList.contains("show")) setCount(data.count);
+        }, POLL_INTERVAL);
+    }
+
+    function stopPolling() {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
+
+    if (window.EventSource) {
+        const source = new EventSource("/notifications/stream/");
+        source.addEventListener("open", stopPolling);
+        source.addEventListener("error", startPolling);
+        source.addEventListener("notification", (e) => {
+            const event = JSON.parse(e.data);
+            stale = true;
+            if (popup.classList.contains("show")) {
+                loadDropdown();
+            } else {
+                setCount(event.unread);
+            }
+        });
+    } else {
+        startPolling();
+    }
+
     bell.addEventListener("click", async (e) => {
         e.stopPropagation();
 
         const isOpen = popup.classList.toggle("show");
         if (!isOpen) return;
 
-        await fetch("/notifications/mark-read/");
-
-        const countEl = document.querySelector(".notification-count");
-        if (countEl) countEl.remove();
+        if (bell.querySelector(".notification-count")) {
+            await fetch("/notifications/mark-read/");
+            setCount(0);
+            stale = true;
+        }
 
-        const res = await fetch("/notifications/dropdown/");
-        const data = await res.json();
-        popup.innerHTML = data.html;
+        if (stale) await loadDropdown();
     });
 
     document.addEventListener("click", () => {